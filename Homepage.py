@@ -1,7 +1,10 @@
 import streamlit as st
-import pandas as pd
 import numpy as np
 
+from metrics import EXCLUDE_P90, season_metrics
+from percentiles import cohort_ranks
+from stats_store import current_season
+
 # ------------------------ Page config ----------------------------------------
 st.set_page_config(
     page_title='Data Analysis',
@@ -56,18 +59,12 @@ st.set_page_config(
 #     return vals, debug
 
 
-@st.cache_data()
-def read_csv(link):
-    return pd.read_csv(link)
-
-
 # ------------------- Read Database -------------------------------------------
-if 'database' not in st.session_state:
-    st.session_state['database'] = read_csv('data/22-23_fbref_stats.csv')
-    # df = read_csv('data/22-23_fbref_stats.csv')
+# Only the chosen league/season partition is loaded. Every session and page
+# shares the same read-only, memory-mapped frame
+league, season, df = current_season()
 # ----------------------------- DATA ------------------------------------------
 # Percentiles
-df = st.session_state['database']
 pizza = df
 
 # fixtures.loc[:, 'Fecha'] = fixtures_date[0]
@@ -87,29 +84,22 @@ st.subheader('Ranks')
 
 # -------------------------------- RANK LIST ----------------------------------
 # CHOOSE VALUE TO RANK
-if 'exclude_values_p90' not in st.session_state:
-    st.session_state['exclude_values_p90'] = ['Percent_of_Challenge_Success',
-                                              'Sh/90',
-                                              'SoT/90'
-                                              ]
+exclude_values_p90 = EXCLUDE_P90
 
-exclude_values_p90 = st.session_state['exclude_values_p90']
+# Precompute the percentile ranks of every position cohort for this season
+cohort_ranks(league, season, tuple(exclude_values_p90))
 
-rv_df = df.iloc[:, 12:]  # Exclude categorical columns
+# Stats p90 where applicable, plus their PAdj versions, computed once per
+# season
+metrics = season_metrics(league, season, tuple(exclude_values_p90))
+
+rv_df = metrics.iloc[:, 12:]  # Exclude categorical columns
 ranked_vals = rv_df.select_dtypes(include=np.number).columns.tolist()
 
 rank_val = st.selectbox('Rank by', ranked_vals, index=6)
 
 # Eliminate columns with 0 on stat to be ranked
-pizza = pizza[pizza[rank_val] != 0]
-
-# Make stat p90 where applicable
-if rank_val in exclude_values_p90:
-    div = 1
-else:
-    div = df['90s']
-
-pizza.loc[:, rank_val] = df[rank_val] / div
+pizza = metrics[metrics[rank_val] != 0]
 
 col1, col2, col3 = st.columns(3)
 with col1:
@@ -130,7 +120,7 @@ with col2:
 # Display rank table
 cols_to_show = ['player', 'team', '90s', rank_val, 'Rank']
 
-pizza['Rank'] = round(pizza[rank_val].rank(pct=True) * 100, 1)
+pizza = pizza.assign(Rank=round(pizza[rank_val].rank(pct=True) * 100, 1))
 pizza = pizza.reset_index(drop=True)
 
 st.dataframe(pizza[cols_to_show].sort_values('Rank', ascending=False))
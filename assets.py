@@ -0,0 +1,79 @@
+import os
+
+import numpy as np
+import streamlit as st
+from matplotlib.font_manager import FontProperties
+from PIL import Image
+
+FONT_DIR = 'assets/fonts'
+
+# Vendored font file of each style
+FONT_FILES = {
+    'normal': 'Roboto-Regular.ttf',
+    'italic': 'Roboto-Italic.ttf',
+    'bold': 'Roboto-Bold.ttf',
+}
+
+# Team crests, one image per team named after it (see `crest_key`). Filled
+# by fetch_crests.py
+CREST_DIR = 'assets/crests'
+# Crest drawn for teams without their own file
+DEFAULT_CREST = 'default'
+CREST_SIZE = (120, 120)
+CREST_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+
+@st.cache_resource
+def load_fonts():
+    """ FontProperties by style, read once per process from FONT_DIR so no
+    page downloads fonts. A style with no file falls back to matplotlib's
+    default sans-serif. """
+    fonts = {}
+    for style, file in FONT_FILES.items():
+        path = os.path.join(FONT_DIR, file)
+
+        if os.path.exists(path):
+            fonts[style] = FontProperties(fname=path)
+        else:
+            fonts[style] = FontProperties(
+                family='sans-serif',
+                style='italic' if style == 'italic' else 'normal',
+                weight='bold' if style == 'bold' else 'normal',
+            )
+
+    return fonts
+
+
+def crest_key(team):
+    """ File name (no extension) of a team crest,
+    e.g. "Nott'ham Forest" -> 'nottham_forest'. """
+    return team.lower().replace("'", '').replace(' ', '_')
+
+
+@st.cache_resource
+def load_crests(size=CREST_SIZE):
+    """ Crest images from CREST_DIR, decoded and shrunk to fit `size` once
+    per process. Returns RGBA arrays keyed by `crest_key`. """
+    crests = {}
+    if not os.path.isdir(CREST_DIR):
+        return crests
+
+    for file in os.listdir(CREST_DIR):
+        name, ext = os.path.splitext(file)
+        if ext.lower() not in CREST_EXTENSIONS:
+            continue
+
+        with Image.open(os.path.join(CREST_DIR, file)) as image:
+            image = image.convert('RGBA')
+            image.thumbnail(size)
+            crests[name] = np.asarray(image)
+
+    return crests
+
+
+def team_crest(team):
+    """ Crest of `team` ready for imshow, the default crest when it has no
+    file, None when neither exists (run fetch_crests.py). """
+    crests = load_crests()
+
+    return crests.get(crest_key(team), crests.get(DEFAULT_CREST))
@@ -0,0 +1,295 @@
+import os
+import re
+import threading
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from mplsoccer import Standardizer
+from pandas.api.types import union_categoricals
+
+from frame_cache import frame_cache
+from zones import Rect, cell_ids
+
+# Low-cardinality text columns, stored as categoricals
+CATEGORICAL_COLUMNS = ['team', 'player', 'home', 'away', 'type', 'outcome_type']
+
+# New matchweeks are dropped next to the season CSV, in a folder named after
+# it (data/2324_events/matchweek_13.csv), with the same columns
+MATCHWEEK_FILE = re.compile(r'matchweek_(\d+)\.csv$')
+# Last matchweek included in the season CSV itself
+CSV_MATCHWEEK = 12
+
+# Events come in Opta coordinates (0-100) and are plotted on StatsBomb pitches
+OPTA_TO_STATSBOMB = Standardizer(pitch_from='opta', pitch_to='statsbomb')
+
+# StatsBomb-space column for each pair of Opta columns
+SB_COLUMNS = {
+    ('x', 'y'): ('sb_x', 'sb_y'),
+    ('end_x', 'end_y'): ('sb_end_x', 'sb_end_y'),
+}
+
+# Grid cell and StatsBomb columns of each event point, for zone queries
+ZONE_POINTS = {
+    'start': ('start_cell', 'sb_x', 'sb_y'),
+    'end': ('end_cell', 'sb_end_x', 'sb_end_y'),
+}
+
+
+def add_statsbomb_coordinates(df):
+    """ Convert the Opta coordinates of every event to StatsBomb space once,
+    as float32 columns named in SB_COLUMNS. """
+    for (x, y), (sb_x, sb_y) in SB_COLUMNS.items():
+        sb_xs, sb_ys = OPTA_TO_STATSBOMB.transform(
+            df[x].to_numpy(dtype=np.float64), df[y].to_numpy(dtype=np.float64))
+        df[sb_x] = sb_xs.astype(np.float32)
+        df[sb_y] = sb_ys.astype(np.float32)
+
+    for cell, x, y in ZONE_POINTS.values():
+        df[cell] = cell_ids(df[x], df[y])
+
+    return df
+
+
+def opta_band(x1, x2):
+    """ Full-width zone between two Opta x values (e.g. the thirds). """
+    (sb_x1, sb_x2), _ = OPTA_TO_STATSBOMB.transform([x1, x2], [0, 0])
+
+    return Rect(sb_x1, sb_x2)
+
+
+def in_zone(df, zone, point='start'):
+    """ Mask of the events of `df` whose `point` ('start' or 'end') lies in
+    `zone`, answered from their grid cells. """
+    cell, x, y = ZONE_POINTS[point]
+
+    return zone.mask(df[cell].to_numpy(), df[x].to_numpy(), df[y].to_numpy())
+
+
+def build_index(df, by):
+    """ Map each value (or tuple of values) of `by` to the sorted row
+    positions where it appears. """
+    return df.groupby(by, observed=True, sort=False).indices
+
+
+def extend_index(index, new_index, offset):
+    """ Copy of `index` with the rows of `new_index` (positions in a chunk
+    appended at `offset`) added. Keys not in the chunk are shared. """
+    index = dict(index)
+    for key, rows in new_index.items():
+        rows = rows + offset
+        index[key] = np.concatenate([index[key], rows]) if key in index \
+            else rows
+
+    return index
+
+
+def read_events(csv_path):
+    """ Parse an events CSV (the season or a matchweek) with derived
+    coordinate and cell columns. Text columns are left for the store to
+    turn into categoricals. """
+    df = pd.read_csv(csv_path)
+    df = df.iloc[:, 1:]  # Drop the saved index column
+
+    return add_statsbomb_coordinates(df)
+
+
+class EventStore:
+    """ Season event table with row indexes by team, match (home, away),
+    event type and the grid cell of each start and end point. Filters are
+    answered by intersecting index arrays instead of masking the full table.
+
+    Matchweeks are appended in place (`refresh`), in any order: only the new
+    rows are parsed and indexed, and each team touched gets a new version for
+    cache keys. `matchweek` is the latest one loaded. """
+
+    def __init__(self, df, updates_dir=None, matchweek=CSV_MATCHWEEK):
+        self.df = df
+        self.by_team = build_index(df, 'team')
+        self.by_match = build_index(df, ['home', 'away'])
+        self.by_type = build_index(df, 'type')
+        self.by_cell = {point: build_index(df, cell)
+                        for point, (cell, _, _) in ZONE_POINTS.items()}
+
+        self.pass_lengths = np.sort(df['length'].dropna().unique())
+
+        self.updates_dir = updates_dir
+        self.csv_matchweek = matchweek
+        self.matchweek = matchweek
+        self.loaded = set()  # Matchweek files appended so far
+        self.version = 0
+        self.team_versions = {}
+        self._lock = threading.RLock()
+
+    def team_version(self, team):
+        """ Times `team` got new events, for cache keys of its filters. """
+        return self.team_versions.get(team, 0)
+
+    def refresh(self):
+        """ Append matchweek files in `updates_dir` not loaded yet, even if
+        a later matchweek already was. Files without events (e.g. only the
+        header so far) are left for a later refresh. Cheap when there are
+        none, so pages can call it every run. """
+        if self.updates_dir is None or not os.path.isdir(self.updates_dir):
+            return
+
+        files = {}
+        for file in os.listdir(self.updates_dir):
+            match = MATCHWEEK_FILE.match(file)
+            if match and self._is_new(int(match.group(1))):
+                files[int(match.group(1))] = file
+
+        for matchweek in sorted(files):
+            path = os.path.join(self.updates_dir, files[matchweek])
+            new = read_events(path)
+            if not new.empty:
+                self.append(new, matchweek)
+
+    def _is_new(self, matchweek):
+        # Matchweeks up to `csv_matchweek` are in the season CSV itself
+        return matchweek > self.csv_matchweek and matchweek not in self.loaded
+
+    def append(self, new, matchweek):
+        """ Add the events of `new` (from `read_events`) as `matchweek`.
+        Indexes are extended with the new rows only. """
+        with self._lock:
+            if not self._is_new(matchweek):
+                return
+
+            offset = len(self.df)
+            new = new.reset_index(drop=True)
+
+            # Keep the existing categories (and codes), adding new ones last
+            df = pd.concat([self.df, new], ignore_index=True)
+            for col in CATEGORICAL_COLUMNS:
+                df[col] = union_categoricals(
+                    [self.df[col], new[col].astype('category')])
+
+            self.by_team = extend_index(self.by_team,
+                                        build_index(new, 'team'), offset)
+            self.by_match = extend_index(self.by_match,
+                                         build_index(new, ['home', 'away']),
+                                         offset)
+            self.by_type = extend_index(self.by_type,
+                                        build_index(new, 'type'), offset)
+            self.by_cell = {
+                point: extend_index(self.by_cell[point],
+                                    build_index(new, cell), offset)
+                for point, (cell, _, _) in ZONE_POINTS.items()
+            }
+            self.pass_lengths = np.union1d(self.pass_lengths,
+                                           new['length'].dropna())
+            self.df = df
+
+            for team in new['team'].dropna().unique():
+                self.team_versions[team] = self.team_version(team) + 1
+            self.loaded.add(matchweek)
+            self.matchweek = max(self.matchweek, matchweek)
+            self.version += 1
+
+    # Readers take the lock too: `append` replaces the table and its indexes
+    # together, and rows of one version are out of range in the other
+
+    def teams(self):
+        with self._lock:
+            return sorted(self.by_team)
+
+    def players(self, team):
+        with self._lock:
+            rows = self.by_team.get(team, [])
+            return np.sort(self.df['player'].iloc[rows].dropna().unique())
+
+    def rivals(self, team):
+        """ Opponents `team` has played, home or away. """
+        with self._lock:
+            rivals = {a for h, a in self.by_match if h == team}
+            rivals |= {h for h, a in self.by_match if a == team}
+
+        return sorted(rivals)
+
+    def rows(self, team, rivals, event_type=None, start_zone=None,
+             end_zone=None):
+        """ Row positions of `team` events in matches against `rivals`,
+        optionally of a single event type and starting/ending in a zone. """
+        with self._lock:
+            return self._rows(team, rivals, event_type, start_zone, end_zone)
+
+    def _rows(self, team, rivals, event_type, start_zone, end_zone):
+        matches = [self.by_match.get((team, r), []) for r in rivals]
+        matches += [self.by_match.get((r, team), []) for r in rivals]
+        rows = np.sort(np.concatenate(matches + [[]]).astype(np.intp))
+
+        rows = np.intersect1d(rows, self.by_team.get(team, []),
+                              assume_unique=True)
+        if event_type is not None:
+            rows = np.intersect1d(rows, self.by_type.get(event_type, []),
+                                  assume_unique=True)
+
+        # Zones are checked on the remaining rows only
+        for point, zone in (('start', start_zone), ('end', end_zone)):
+            if zone is not None:
+                cell, x, y = ZONE_POINTS[point]
+                rows = rows[zone.mask(self.df[cell].to_numpy()[rows],
+                                      self.df[x].to_numpy()[rows],
+                                      self.df[y].to_numpy()[rows])]
+
+        return rows
+
+    def zone_rows(self, zone, point='start'):
+        """ Row positions of all events whose `point` lies in `zone`, read
+        from the cell index without scanning the season. """
+        cell, x, y = ZONE_POINTS[point]
+        full, partial = zone.cells()
+        with self._lock:
+            by_cell, df = self.by_cell[point], self.df
+
+        rows = [by_cell[c] for c in np.flatnonzero(full) if c in by_cell]
+        for c in np.flatnonzero(partial):
+            if c in by_cell:
+                edge = by_cell[c]
+                rows.append(edge[zone.contains(df[x].to_numpy()[edge],
+                                               df[y].to_numpy()[edge])])
+
+        return np.sort(np.concatenate(rows + [[]]).astype(np.intp))
+
+    def select(self, team, rivals, event_type=None, start_zone=None,
+               end_zone=None):
+        with self._lock:
+            return self.df.iloc[self.rows(team, rivals, event_type,
+                                          start_zone, end_zone)]
+
+
+def player_stats(df):
+    """ Per-player totals of `df` in one groupby: events, successful,
+    unsuccessful, share of the team's events (%) and completion (%). """
+    outcome = df['outcome_type']
+    stats = pd.DataFrame({
+        'player': df['player'],
+        'successful': outcome == 'Successful',
+        'unsuccessful': outcome == 'Unsuccessful',
+    }).groupby('player', observed=True).agg(
+        events=('successful', 'size'),
+        successful=('successful', 'sum'),
+        unsuccessful=('unsuccessful', 'sum'),
+    )
+
+    stats['share'] = (stats['events'] / stats['events'].sum() * 100).round(1)
+    stats['completion'] = (stats['successful'] / stats['events'] * 100).round(1)
+
+    return stats
+
+
+@frame_cache(max_entries=64)
+def cached_player_stats(df):
+    return player_stats(df)
+
+
+@st.cache_resource
+def load_events(csv_path):
+    """ Parse the events CSV once per process. The returned store is shared
+    by every session, so treat its table as read-only. New matchweeks are
+    picked up by `EventStore.refresh`. """
+    df = read_events(csv_path)
+    df[CATEGORICAL_COLUMNS] = df[CATEGORICAL_COLUMNS].astype('category')
+
+    return EventStore(df, updates_dir=os.path.splitext(csv_path)[0])
@@ -0,0 +1,82 @@
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+import streamlit as st
+
+EXPORT_FORMATS = {
+    'png': 'image/png',
+    'pdf': 'application/pdf',
+    'svg': 'image/svg+xml',
+}
+EXPORT_DPIS = [150, 300, 500]
+
+@st.cache_resource
+def export_executor(max_workers=2):
+    """ Background workers shared by every session for figure exports. """
+    return ThreadPoolExecutor(max_workers=max_workers,
+                              thread_name_prefix='export')
+
+
+def render_export(draw, args, fmt, dpi):
+    """ Build a fresh figure with `draw(*args)` and encode it. `draw` must not
+    use pyplot or Streamlit (caches included), as it runs outside the script
+    thread: resolve what it needs first and pass it in `args`. """
+    fig = draw(*args)
+    buf = io.BytesIO()
+    fig.savefig(buf, format=fmt, dpi=dpi, bbox_inches='tight')
+
+    return buf.getvalue()
+
+
+def export_controls(key, draw, args, file_name, filters):
+    """ Format/DPI pickers and an Export button. Clicking it queues the
+    export on the background workers; the job stays in the session until
+    `filters` change. Returns the pending export for `show_download`, or
+    None. """
+    col1, col2, col3 = st.columns(3)
+    fmt = col1.selectbox('Format', list(EXPORT_FORMATS), key=f'{key}_fmt')
+    dpi = col2.selectbox('DPI', EXPORT_DPIS, index=1, key=f'{key}_dpi')
+
+    job_key = f'{key}_export_job'
+    if col3.button('Export', key=f'{key}_export'):
+        future = export_executor().submit(render_export, draw, args, fmt, dpi)
+        st.session_state[job_key] = (filters, future, fmt, dpi)
+
+    job = st.session_state.get(job_key)
+    if job is None or job[0] != filters:
+        st.session_state.pop(job_key, None)
+        return None
+
+    _, future, fmt, dpi = job
+    slot = st.empty()
+    slot.caption(f'Exporting {fmt.upper()} at {dpi} dpi...')
+
+    return key, slot, future, fmt, f'{file_name}_{dpi}dpi.{fmt}'
+
+
+def show_download(export):
+    """ Swap a finished export's placeholder for a download button. While it
+    is still running a 'Check export' button is shown instead: the page is
+    never rerun on its own, so a running export costs no page runs. Call at
+    the end of the page. """
+    if export is None:
+        return
+
+    key, slot, future, fmt, file_name = export
+    if not future.done():
+        # Clicking reruns the page, which checks on the export again
+        pending = slot.container()
+        pending.caption(f'Exporting {file_name}...')
+        pending.button('Check export', key=f'{key}_check')
+        return
+
+    if future.exception() is not None:
+        slot.error(f'Export failed: {future.exception()}')
+        return
+
+    slot.download_button(
+        label=f'Download {file_name}',
+        data=future.result(),
+        file_name=file_name,
+        mime=EXPORT_FORMATS[fmt],
+    )
@@ -0,0 +1,51 @@
+""" Fill assets/crests with team crests, so the Chalkboard draws them
+without going online. Run once (and after adding teams):
+
+    python fetch_crests.py
+
+Existing files are kept, pass --force to download them again. """
+import io
+import os
+import sys
+from urllib.request import urlopen
+
+from PIL import Image
+
+from assets import CREST_DIR, CREST_SIZE, DEFAULT_CREST, crest_key
+
+# Crest image of each team. DEFAULT_CREST is drawn for teams without one
+CREST_URLS = {
+    DEFAULT_CREST: 'https://cdn5.wyscout.com/photos/team/public/'
+                   '25_120x120.png',
+}
+
+
+def fetch_crest(name, url, force=False):
+    """ Download one crest to CREST_DIR/<name>.png, shrunk to CREST_SIZE.
+    Returns False when it was already there. """
+    path = os.path.join(CREST_DIR, f'{name}.png')
+    if os.path.exists(path) and not force:
+        return False
+
+    with urlopen(url) as response:
+        image = Image.open(io.BytesIO(response.read())).convert('RGBA')
+    image.thumbnail(CREST_SIZE)
+    image.save(path)
+
+    return True
+
+
+def main(argv):
+    force = '--force' in argv
+    os.makedirs(CREST_DIR, exist_ok=True)
+
+    for team, url in CREST_URLS.items():
+        name = crest_key(team)
+        if fetch_crest(name, url, force):
+            print(f'{name}.png: downloaded')
+        else:
+            print(f'{name}.png: already there')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,30 @@
+import hashlib
+
+import pandas as pd
+import streamlit as st
+
+
+def frame_key(df):
+    """ Digest of a DataFrame's columns, dtypes, index and values. A few ms
+    for the tables of this app. """
+    hasher = hashlib.blake2b(digest_size=16)
+    hasher.update(repr((list(df.columns),
+                        list(df.dtypes.astype(str)))).encode())
+    hasher.update(pd.util.hash_pandas_object(df, index=True)
+                  .to_numpy().tobytes())
+
+    return hasher.hexdigest()
+
+
+def frame_cache(func=None, *, max_entries=None):
+    """ `st.cache_resource` for functions of DataFrames: frame arguments are
+    keyed by their contents (`frame_key`), so a result is reused for the
+    same data and never for stale data, whatever produced the frame.
+
+    Like any `st.cache_resource`, one result per input is kept for the
+    whole process and shared by every session, so callers must treat
+    results as read-only. """
+    cache = st.cache_resource(max_entries=max_entries,
+                              hash_funcs={pd.DataFrame: frame_key})
+
+    return cache if func is None else cache(func)
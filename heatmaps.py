@@ -0,0 +1,159 @@
+import numpy as np
+
+from event_store import ZONE_POINTS
+from frame_cache import frame_cache
+from zones import PITCH_LENGTH, PITCH_WIDTH
+
+# Rectangular bins as (x edges, y edges) in StatsBomb coordinates. Juego de
+# posición zones are mplsoccer's positional_x/positional_y
+BIN_EDGES = {
+    'Grid': (np.linspace(0, PITCH_LENGTH, 7), np.linspace(0, PITCH_WIDTH, 5)),
+    'Juego de Posición': (np.array([0, 18, 39, 60, 81, 102, 120]),
+                          np.array([0, 18, 30, 50, 62, 80])),
+}
+
+# Hexagons across the pitch length and width, and the area they tile
+HEX_GRIDSIZE = (17, 8)
+HEX_EXTENT = (0, PITCH_LENGTH, 0, PITCH_WIDTH)
+
+BIN_TYPES = list(BIN_EDGES) + ['Hexbin']
+
+
+def rect_bins(x, y, x_edges, y_edges):
+    """ Bin of each point, numbered row by row (y, then x) like the
+    statistic of mplsoccer's bin_statistic. -1 where the point is missing. """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    nx, ny = len(x_edges) - 1, len(y_edges) - 1
+
+    # Points on an inner edge go to the next bin along x and the previous
+    # one along y, as mplsoccer bins the flipped StatsBomb y
+    col = np.clip(np.searchsorted(x_edges, x, side='right') - 1, 0, nx - 1)
+    row = np.clip(np.searchsorted(y_edges, y, side='left') - 1, 0, ny - 1)
+    bins = row * nx + col
+    bins[np.isnan(x) | np.isnan(y)] = -1
+
+    return bins
+
+
+def _hex_scale(gridsize, extent):
+    # Same lattice as matplotlib's hexbin, padding included
+    nx, ny = gridsize
+    xmin, xmax, ymin, ymax = extent
+    padding = 1.e-9 * (xmax - xmin)
+    xmin, xmax = xmin - padding, xmax + padding
+
+    return nx, ny, xmin, ymin, (xmax - xmin) / nx, (ymax - ymin) / ny
+
+
+def hex_bins(x, y, gridsize=HEX_GRIDSIZE, extent=HEX_EXTENT):
+    """ Hexagon of each point, numbered like matplotlib's hexbin: the
+    (nx + 1) * (ny + 1) lattice of corner hexagons first, then the nx * ny
+    lattice of inner ones. -1 where the point is missing or off the grid. """
+    nx, ny, xmin, ymin, sx, sy = _hex_scale(gridsize, extent)
+    x = (np.asarray(x, dtype=np.float64) - xmin) / sx
+    y = (np.asarray(y, dtype=np.float64) - ymin) / sy
+    missing = np.isnan(x) | np.isnan(y)
+    x, y = np.nan_to_num(x), np.nan_to_num(y)
+
+    ix1, iy1 = np.round(x).astype(int), np.round(y).astype(int)
+    ix2, iy2 = np.floor(x).astype(int), np.floor(y).astype(int)
+    in1 = (ix1 >= 0) & (ix1 <= nx) & (iy1 >= 0) & (iy1 <= ny)
+    in2 = (ix2 >= 0) & (ix2 < nx) & (iy2 >= 0) & (iy2 < ny)
+
+    # Nearest of the two candidate centres
+    d1 = (x - ix1) ** 2 + 3.0 * (y - iy1) ** 2
+    d2 = (x - ix2 - 0.5) ** 2 + 3.0 * (y - iy2 - 0.5) ** 2
+    bins = np.where(d1 < d2,
+                    np.where(in1, ix1 * (ny + 1) + iy1, -1),
+                    np.where(in2, (nx + 1) * (ny + 1) + ix2 * ny + iy2, -1))
+    bins[missing] = -1
+
+    return bins
+
+
+def hex_centres(gridsize=HEX_GRIDSIZE, extent=HEX_EXTENT):
+    """ x and y of every hexagon centre, in `hex_bins` order. """
+    nx, ny, xmin, ymin, sx, sy = _hex_scale(gridsize, extent)
+    cx = np.concatenate([np.repeat(np.arange(nx + 1), ny + 1),
+                         np.repeat(np.arange(nx) + 0.5, ny)])
+    cy = np.concatenate([np.tile(np.arange(ny + 1), nx + 1),
+                         np.tile(np.arange(ny) + 0.5, nx)])
+
+    return cx * sx + xmin, cy * sy + ymin
+
+
+def n_bins(bin_type):
+    if bin_type == 'Hexbin':
+        nx, ny = HEX_GRIDSIZE
+        return (nx + 1) * (ny + 1) + nx * ny
+
+    x_edges, y_edges = BIN_EDGES[bin_type]
+    return (len(x_edges) - 1) * (len(y_edges) - 1)
+
+
+class BinnedEvents:
+    """ Events and successful events of a filtered selection, counted per
+    player and bin for every bin type and point ('start'/'end'). A player
+    selection only sums rows of these tables, nothing is binned again. """
+
+    def __init__(self, df):
+        self.players = df['player'].cat.categories
+        codes = df['player'].cat.codes.to_numpy(dtype=np.int64)
+        successful = (df['outcome_type'] == 'Successful').to_numpy()
+
+        self.counts = {}
+        self.successes = {}
+        for point, (_, x, y) in ZONE_POINTS.items():
+            for bin_type in BIN_TYPES:
+                if bin_type == 'Hexbin':
+                    bins = hex_bins(df[x], df[y])
+                else:
+                    bins = rect_bins(df[x], df[y], *BIN_EDGES[bin_type])
+
+                size = n_bins(bin_type)
+                keep = (bins >= 0) & (codes >= 0)
+                flat = codes[keep] * size + bins[keep]
+                shape = (len(self.players), size)
+
+                key = (point, bin_type)
+                self.counts[key] = np.bincount(
+                    flat, minlength=shape[0] * size).reshape(shape)
+                self.successes[key] = np.bincount(
+                    flat, weights=successful[keep],
+                    minlength=shape[0] * size).reshape(shape)
+
+    def stats(self, point, bin_type, players=None):
+        """ Events and successful events per bin of `players` (all when
+        None) starting/ending there. """
+        counts = self.counts[(point, bin_type)]
+        successes = self.successes[(point, bin_type)]
+
+        if players is not None:
+            rows = self.players.get_indexer(players)
+            rows = rows[rows >= 0]
+            counts, successes = counts[rows], successes[rows]
+
+        return counts.sum(axis=0), successes.sum(axis=0)
+
+
+@frame_cache(max_entries=64)
+def binned_events(df):
+    return BinnedEvents(df)
+
+
+def rect_stats(values, bin_type):
+    """ Per-bin `values` of a rectangular bin type in the dict layout of
+    mplsoccer's bin_statistic, ready for heatmap and label_heatmap. """
+    x_edges, y_edges = BIN_EDGES[bin_type]
+    x_grid, y_grid = np.meshgrid(x_edges, y_edges)
+    cx, cy = np.meshgrid((x_edges[:-1] + x_edges[1:]) / 2,
+                         (y_edges[:-1] + y_edges[1:]) / 2)
+
+    return {
+        'statistic': np.reshape(values, cx.shape),
+        'x_grid': x_grid,
+        'y_grid': y_grid,
+        'cx': cx,
+        'cy': cy,
+    }
@@ -0,0 +1,65 @@
+import io
+import threading
+from collections import OrderedDict
+
+import matplotlib.pyplot as plt
+import streamlit as st
+
+
+class ImageCache:
+    """ Least-recently-used store of rendered images (encoded bytes), capped
+    by their total size. Safe to share between sessions. """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._images = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            image = self._images.get(key)
+            if image is not None:
+                self._images.move_to_end(key)
+
+            return image
+
+    def put(self, key, image):
+        if len(image) > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._images:
+                self.size -= len(self._images.pop(key))
+            self._images[key] = image
+            self.size += len(image)
+
+            # Evict least recently used images until under the cap
+            while self.size > self.max_bytes:
+                _, old = self._images.popitem(last=False)
+                self.size -= len(old)
+
+    def get_or_render(self, key, render):
+        """ Cached image for `key`, calling `render()` for the bytes on a
+        miss. """
+        image = self.get(key)
+        if image is None:
+            image = render()
+            self.put(key, image)
+
+        return image
+
+
+def figure_to_png(fig, dpi=200):
+    """ Encode a figure the way st.pyplot does and free it. """
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', dpi=dpi, bbox_inches='tight')
+    plt.close(fig)
+
+    return buf.getvalue()
+
+
+@st.cache_resource
+def image_cache(name, max_mb=64):
+    """ Process-wide image cache, one per `name`. """
+    return ImageCache(max_mb * 1024 ** 2)
@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from stats_store import load_season
+
+# Stats that are already rates, so they are not divided by 90s played
+EXCLUDE_P90 = ('Percent_of_Challenge_Success', 'Sh/90', 'SoT/90')
+
+# Possession-adjusted (PAdj) stats, scaled to a 50% possession game.
+# Defensive actions depend on how long the opponent has the ball...
+PADJ_DEFENSIVE = ('Tkl', 'TklWinPoss', 'Def3rdTkl', 'Mid3rdTkl', 'Att3rdTkl',
+                  'DrbTkl', 'DrbPastAtt', 'Blocks', 'ShBlocks', 'PassBlocks',
+                  'Int', 'Tkl+Int', 'Clr', 'Recov')
+# ...and on-ball ones on how long the player's team has it
+PADJ_POSSESSION = ('Touches', 'LiveTouch', 'PassesCompleted',
+                   'PassesAttempted', 'Carries', 'ReceivedPass')
+PADJ_PREFIX = 'PAdj '
+
+
+def stat_columns(df):
+    """ Numeric stat columns, skipping the leading categorical/info columns. """
+    return df.iloc[:, 12:].select_dtypes(include=np.number).columns.tolist()
+
+
+def per90_values(df, stats, exclude_vals=EXCLUDE_P90):
+    """ `stats` of `df` divided by 90s played, except `exclude_vals`. """
+    vals = df[stats]
+    p90 = vals.div(df['90s'], axis=0)
+
+    excluded = [s for s in stats if s in exclude_vals]
+    p90[excluded] = vals[excluded]
+
+    return p90
+
+
+def per90(df, exclude_vals=EXCLUDE_P90):
+    """ Copy of `df` with every stat column per 90, info columns and column
+    order unchanged. `df` itself is never modified. """
+    stats = stat_columns(df)
+    p90 = per90_values(df, stats, exclude_vals)
+
+    return pd.concat([df.drop(columns=stats), p90], axis=1)[df.columns]
+
+
+def team_possession(df):
+    """ Season possession share (0-1) of each team, estimated like FBref's
+    from passes attempted: the team's against the average of the other teams
+    in the table, as their opponents' passes are not in it. """
+    passes = df.groupby('team', observed=True)['PassesAttempted'].sum()
+    others = (passes.sum() - passes) / (len(passes) - 1)
+
+    return passes / (passes + others)
+
+
+def padj_values(df, p90):
+    """ `PAdj <stat>` columns for the PAdj stats of `p90` (per-90 values of
+    `df`), using the possession of each player's team. """
+    possession = df['team'].map(team_possession(df)).astype(float)
+
+    padj = {}
+    for stats, share in ((PADJ_DEFENSIVE, 1 - possession),
+                         (PADJ_POSSESSION, possession)):
+        for stat in stats:
+            if stat in p90:
+                padj[PADJ_PREFIX + stat] = p90[stat] * 0.5 / share
+
+    return pd.DataFrame(padj, index=df.index)
+
+
+def derived_metrics(df, exclude_vals=EXCLUDE_P90):
+    """ `per90` of `df` with the PAdj columns appended after its stats. """
+    p90 = per90(df, exclude_vals)
+
+    return pd.concat([p90, padj_values(df, p90)], axis=1)
+
+
+@st.cache_resource
+def season_metrics(league, season, exclude_vals=EXCLUDE_P90):
+    """ `derived_metrics` of a league and season
+    (`stats_store.load_season`), computed once per process. """
+    return derived_metrics(load_season(league, season), exclude_vals)
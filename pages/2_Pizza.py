@@ -1,16 +1,22 @@
 import streamlit as st
-import numpy as np
 import pandas as pd
-from mplsoccer import PyPizza, add_image, FontManager
+from mplsoccer import PyPizza, add_image
 import matplotlib.pyplot as plt
 
-# Load fonts
-font_normal = FontManager('https://raw.githubusercontent.com/google/fonts/main/apache/roboto/'
-                          'Roboto%5Bwdth,wght%5D.ttf')
-font_italic = FontManager('https://raw.githubusercontent.com/google/fonts/main/apache/roboto/'
-                          'Roboto-Italic%5Bwdth,wght%5D.ttf')
-font_bold = FontManager('https://raw.githubusercontent.com/google/fonts/main/apache/robotoslab/'
-                        'RobotoSlab%5Bwght%5D.ttf')
+from metrics import EXCLUDE_P90, season_metrics, stat_columns
+from percentiles import (cohort_label, cohort_ranks, percentile_ranks,
+                         player_ranks)
+from assets import load_fonts
+from image_cache import figure_to_png, image_cache
+from similarity import similarity_index
+from stats_store import (current_season, league_label, partitions,
+                         season_label)
+
+# Load fonts from the local bundle, shared by every page
+fonts = load_fonts()
+font_normal = fonts['normal']
+font_italic = fonts['italic']
+font_bold = fonts['bold']
 
 green = '#2ba02b'
 red = '#d70232'
@@ -29,49 +35,112 @@ def map_stat_labels(labels_list):
     return labels_list
 
 
-def rank_data(stat_list, input_df, exclude_vals):
-    vals = []
-    debug = pd.DataFrame(input_df[['player', 'team', '90s']])
+def default_index(options, default):
+    # Position of `default` in `options`, or the first option when the
+    # league/season picked does not have it
+    return options.index(default) if default in options else 0
 
-    for val in stat_list:
-        ranks_df = pd.DataFrame(input_df[['player', 'team', '90s']])
-        ranks_df.loc[:, val] = input_df[val]
-        debug.loc[:, val] = input_df[val]
-        # Eliminate columns with 0 on stat to be ranked
-        ranks_df = ranks_df[ranks_df[val] != 0]
-        # Filter out players with less than 450 mins
-        ranks_df = ranks_df[ranks_df['90s'] >= 5]
 
-        # Make stat p90 where applicable
-        if val in exclude_vals:
-            div = 1
-        else:
-            div = ranks_df['90s']
+def draw_pizza(labels, values, slice_colors, text_colors, title, subtitle):
+    baker = PyPizza(
+        params=labels,
+        background_color="#222222",  # background color
+        straight_line_color="#000000",  # color for straight lines
+        straight_line_lw=1,
+        last_circle_lw=1,  # linewidth of last circle
+        other_circle_lw=0,  # linewidth for other circles
+        inner_circle_size=20  # size of inner circle
 
-        ranks_df.loc[:, val] = ranks_df[val] / div
+    )
 
-        # Calculate rank from available players
-        ranks_df.loc[:, val] = round(ranks_df[val].rank(pct=True) * 100, 2)
-        debug.loc[:, val] = ranks_df.loc[:, val]  # copy ranks to debug table
-        # Store rank for selected player
-        try:
-            vals.append(ranks_df[val][ranks_df['player'] == player].iloc[0])
+    fig_pizza, ax = baker.make_pizza(
+        values=values,
+        figsize=(8, 8.5),  # adjust the figsize according to your need
+        color_blank_space="same",  # use the same color to fill blank space
+        slice_colors=slice_colors,  # color for individual slices
+        value_colors=text_colors,  # color for the value-text
+        value_bck_colors=slice_colors,  # color for the blank spaces
+        blank_alpha=0.4,  # alpha for blank-space colors
+        kwargs_slices=dict(
+            edgecolor="#000000", zorder=2, linewidth=1
+        ),  # values to be used when plotting slices
+        kwargs_params=dict(
+            color="#F2F2F2", fontsize=11,
+            va='center',
+            wrap=True
+        ),  # values to be used when adding parameter labels
+        kwargs_values=dict(
+            color="#F2F2F2", fontsize=11,
+            zorder=3,
+            bbox=dict(
+                edgecolor="#000000", facecolor="cornflowerblue",
+                boxstyle="round,pad=0.2", lw=1
+            )
+        )  # values to be used when adding parameter-values labels
+    )
 
-        except IndexError:
-            vals.append(0)
+    # ----------------------------- TEXT ELEMENTS
+    # Add credits
+    CREDIT_1 = "data: opta via fbref"
+    CREDIT_2 = "inspired by: @Worville, @FootballSlices, @somazerofc & @Soumyaj15209314"
 
-    return vals, debug
+    fig_pizza.text(
+        0.01, 0.02, f"{CREDIT_1}\n{CREDIT_2}", size=9,
+        color="#F2F2F2",
+        ha="left"
+    )
 
+    # Add title
+    fig_pizza.text(
+        0.515, 0.975, title, size=16,
+        ha="center", fontproperties=font_bold, color="#F2F2F2"
+    )
 
-# -------------------------------- DATA ---------------------------------------
-df = st.session_state['database']
-pizza_rank = pd.DataFrame(df)
+    # add subtitle
+    fig_pizza.text(
+        0.515, 0.95,
+        subtitle,
+        size=13,
+        ha="center", fontproperties=font_bold, color="#F2F2F2"
+    )
 
+    leg_h = 0.92
+
+    # add text
+    fig_pizza.text(
+        0.24, leg_h, "Attacking"
+                     + "       "
+                     + "Playmaking"
+                     + "       "
+                     + "Possession"
+                     + "       "
+                     + "Defending",
+        size=14,
+        fontproperties=font_bold, color="#F2F2F2"
+    )
 
-exclude_values_p90 = st.session_state['exclude_values_p90']
+    # add rectangles
+    fig_pizza.patches.extend([
+        plt.Rectangle(
+            (0.205, leg_h), 0.025, 0.021, fill=True, color=red,
+            transform=fig_pizza.transFigure, figure=fig_pizza
+        ),
+        plt.Rectangle(
+            (0.365, leg_h), 0.025, 0.021, fill=True, color=green,
+            transform=fig_pizza.transFigure, figure=fig_pizza
+        ),
+        plt.Rectangle(
+            (0.545, leg_h), 0.025, 0.021, fill=True, color=yellow,
+            transform=fig_pizza.transFigure, figure=fig_pizza
+        ),
+        plt.Rectangle(
+            (0.715, leg_h), 0.025, 0.021, fill=True, color=blue,
+            transform=fig_pizza.transFigure, figure=fig_pizza
+        ),
+    ])
+
+    return fig_pizza
 
-rv_df = df.iloc[:, 12:]  # Exclude categorical columns
-ranked_vals = rv_df.select_dtypes(include=np.number).columns.tolist()
 
 # ------------------------ Page config ----------------------------------------
 st.set_page_config(
@@ -79,6 +148,19 @@ st.set_page_config(
     page_icon=':soccer:'
 )
 
+# -------------------------------- DATA ---------------------------------------
+# Shared, read-only stats of the league and season picked in the sidebar
+league, season, df = current_season()
+partition = (league, season)
+pizza_rank = pd.DataFrame(df)
+
+
+exclude_values_p90 = EXCLUDE_P90
+
+# Stats p90 where applicable, plus their PAdj versions
+ranked_vals = stat_columns(season_metrics(*partition,
+                                          tuple(exclude_values_p90)))
+
 # ------------------------- RANK PIZZA PLOT ------------------------------
 st.subheader('Rank bar plot')
 
@@ -150,49 +232,52 @@ with tab_atk:
             ]
         )
 
-col1, col2 = st.columns(2)
+col1, col2, col3 = st.columns(3)
 
 with col1:
     # Filter by team
-    teams = pizza_rank.team.unique()
+    teams = list(pizza_rank.team.unique())
     team = st.selectbox(
         label='Choose Team',
-        options=pizza_rank.team.unique(),
-        index=int(np.where(teams == 'Manchester City')[0][0]),
+        options=teams,
+        index=default_index(teams, 'Manchester City'),
     )
 
 
 with col2:
     # Filter by player
-    players_from_team = pizza_rank[pizza_rank['team'] == team].player
+    players_from_team = list(pizza_rank[pizza_rank['team'] == team].player)
     player = st.selectbox(
         label='Choose Player',
         options=players_from_team,
-        index=int(np.where(players_from_team == 'Rodri')[0][0]),
+        index=default_index(players_from_team, 'Rodri'),
         # index=18,
     )
     # Player is filtered after calculating ranks
 
+with col3:
+    # Rank against a position cohort, the player's main position by default
+    cohorts = list(cohort_ranks(*partition, tuple(exclude_values_p90)))
+    player_pos = pizza_rank.loc[(pizza_rank['team'] == team)
+                                & (pizza_rank['player'] == player), 'pos']
+    main_pos = str(player_pos.iloc[0]).split(',')[0]
+    cohort = st.selectbox(
+        label='Rank vs',
+        options=cohorts,
+        index=cohorts.index(main_pos) if main_pos in cohorts else 0,
+        format_func=cohort_label,
+    )
+
+# Percentile ranks of every stat, precomputed per cohort
+ranks = percentile_ranks(*partition,
+                         tuple(exclude_values_p90),
+                         cohort=cohort)
+
 # Vals for pizza chart
-rank_vals_def, ranks_debug_def = rank_data(stats_def,
-                                           pizza_rank,
-                                           exclude_values_p90
-                                           )
-
-rank_vals_poss, ranks_debug_poss = rank_data(stats_poss,
-                                             pizza_rank,
-                                             exclude_values_p90
-                                             )
-
-rank_vals_pmk, ranks_debug_pmk = rank_data(stats_pmk,
-                                           pizza_rank,
-                                           exclude_values_p90,
-                                           )
-
-rank_vals_atk, ranks_debug_atk = rank_data(stats_atk,
-                                           pizza_rank,
-                                           exclude_values_p90
-                                           )
+rank_vals_def = player_ranks(ranks, player, team, stats_def)
+rank_vals_poss = player_ranks(ranks, player, team, stats_poss)
+rank_vals_pmk = player_ranks(ranks, player, team, stats_pmk)
+rank_vals_atk = player_ranks(ranks, player, team, stats_atk)
 
 # Format labels for pizza plot
 labels = [x.replace('_', '\n') for x in
@@ -221,120 +306,65 @@ text_colors = ["#000000"] * (n_def + n_poss + n_pmk) + ["#F2F2F2"] * n_atk
 
 concat_of_vals = rank_vals_def + rank_vals_poss + rank_vals_pmk + rank_vals_atk
 
-baker = PyPizza(
-    params=labels,
-    background_color="#222222",  # background color
-    straight_line_color="#000000",  # color for straight lines
-    straight_line_lw=1,
-    last_circle_lw=1,  # linewidth of last circle
-    other_circle_lw=0,  # linewidth for other circles
-    inner_circle_size=20  # size of inner circle
-
+# Rendering is the slow part, so serve the chart from the shared image cache
+pizza_key = (partition, tuple(exclude_values_p90), player, team,
+             tuple(stats_def), tuple(stats_poss), tuple(stats_pmk),
+             tuple(stats_atk), cohort)
+
+pizza_png = image_cache('pizza').get_or_render(
+    pizza_key,
+    lambda: figure_to_png(draw_pizza(
+        labels,
+        concat_of_vals,
+        slice_colors,
+        text_colors,
+        title=f"{player} - {team}",
+        subtitle=f"Percentile Rank vs {league_label(league)} "
+                 f"{cohort_label(cohort)} | Season {season_label(season)}",
+    ))
 )
 
-fig_pizza, ax = baker.make_pizza(
-    values=concat_of_vals,
-    figsize=(8, 8.5),  # adjust the figsize according to your need
-    color_blank_space="same",  # use the same color to fill blank space
-    slice_colors=slice_colors,  # color for individual slices
-    value_colors=text_colors,  # color for the value-text
-    value_bck_colors=slice_colors,  # color for the blank spaces
-    blank_alpha=0.4,  # alpha for blank-space colors
-    kwargs_slices=dict(
-        edgecolor="#000000", zorder=2, linewidth=1
-    ),  # values to be used when plotting slices
-    kwargs_params=dict(
-        color="#F2F2F2", fontsize=11,
-        va='center',
-        wrap=True
-    ),  # values to be used when adding parameter labels
-    kwargs_values=dict(
-        color="#F2F2F2", fontsize=11,
-        zorder=3,
-        bbox=dict(
-            edgecolor="#000000", facecolor="cornflowerblue",
-            boxstyle="round,pad=0.2", lw=1
-        )
-    )  # values to be used when adding parameter-values labels
-)
-
-# ----------------------------- TEXT ELEMENTS
-# Add credits
-CREDIT_1 = "data: opta via fbref"
-CREDIT_2 = "inspired by: @Worville, @FootballSlices, @somazerofc & @Soumyaj15209314"
-
-fig_pizza.text(
-    0.01, 0.02, f"{CREDIT_1}\n{CREDIT_2}", size=9,
-    color="#F2F2F2",
-    ha="left"
-)
-
-# Add title
-fig_pizza.text(
-    0.515, 0.975, f"{player} - {team}", size=16,
-    ha="center", fontproperties=font_bold.prop, color="#F2F2F2"
-)
-
-# add subtitle
-league = 'Premier League'
-season = '22-23'
-fig_pizza.text(
-    0.515, 0.95,
-    f"Percentile Rank vs {league} Midfielders | Season {season}",
-    size=13,
-    ha="center", fontproperties=font_bold.prop, color="#F2F2F2"
-)
-
-leg_h = 0.92
-
-# add text
-fig_pizza.text(
-    0.24, leg_h, "Attacking"
-                 + "       "
-                 + "Playmaking"
-                 + "       "
-                 + "Possession"
-                 + "       "
-                 + "Defending",
-    size=14,
-    fontproperties=font_bold.prop, color="#F2F2F2"
-)
+# Show plot
+st.image(pizza_png, use_column_width=True)
 
-# add rectangles
-fig_pizza.patches.extend([
-    plt.Rectangle(
-        (0.205, leg_h), 0.025, 0.021, fill=True, color=red,
-        transform=fig_pizza.transFigure, figure=fig_pizza
-    ),
-    plt.Rectangle(
-        (0.365, leg_h), 0.025, 0.021, fill=True, color=green,
-        transform=fig_pizza.transFigure, figure=fig_pizza
-    ),
-    plt.Rectangle(
-        (0.545, leg_h), 0.025, 0.021, fill=True, color=yellow,
-        transform=fig_pizza.transFigure, figure=fig_pizza
-    ),
-    plt.Rectangle(
-        (0.715, leg_h), 0.025, 0.021, fill=True, color=blue,
-        transform=fig_pizza.transFigure, figure=fig_pizza
-    ),
-])
+st.divider()
+# ----------------------------- Similar players
+st.subheader(f'Players similar to {player}')
+
+# Compare on every pizza stat or on one tab's, over all leagues and seasons
+stat_sets = {
+    'Pizza stats': stats_def + stats_poss + stats_pmk + stats_atk,
+    'Defense': stats_def,
+    'Possession': stats_poss,
+    'Playmaking': stats_pmk,
+    'Attack': stats_atk,
+}
 
-# Show plot
-st.pyplot(fig_pizza)
+col1, col2 = st.columns(2)
+with col1:
+    stat_set = st.selectbox('Compare on', list(stat_sets))
+with col2:
+    n_similar = st.slider('Players', min_value=5, max_value=50, value=10)
+
+similar_stats = tuple(dict.fromkeys(stat_sets[stat_set]))
+if similar_stats:
+    index = similarity_index(tuple(partitions()), similar_stats,
+                             tuple(exclude_values_p90))
+    row = index.row(league, season, team, player)
+    similar = index.neighbours(row, k=n_similar)
+    similar['league'] = similar['league'].map(league_label)
+    similar['season'] = similar['season'].map(season_label)
+    st.dataframe(similar, hide_index=True)
 
 st.divider()
 # ----------------------------- Ranks Datatable
 
 
-# Create datatable for checking ranks from all players
-ranks_debug = ranks_debug_def.merge(ranks_debug_poss, how='left')
-ranks_debug = ranks_debug.merge(ranks_debug_atk, how='left')
-
-st.dataframe(ranks_debug[['player'] + stats_def + stats_poss + stats_atk])
+# Datatable for checking ranks from all players
+debug_cols = list(dict.fromkeys(stats_def + stats_poss + stats_atk))
+st.dataframe(ranks[['player'] + debug_cols])
 
 st.divider()
 
 st.text('TO-DO\n'
-        '- Make ranks per position (Pizza)\n'
         '- Get Positions from TransferMarket\n')
@@ -2,22 +2,196 @@ import streamlit as st
 import plotly.graph_objects as go
 import plotly.express as px
 import numpy as np
-import statsmodels.api as sm
+
+from metrics import season_metrics
+from percentiles import MIN_90S
+from stats_store import current_season
+from trends import (TREND_TYPES, ZONE_TYPES, scatter_trend,
+                    scatter_zone_lines, season_correlations)
 
 
 # ---------------------------- FUNCTIONS --------------------------------------
 
 
-def make_p90(dataframe, stat):
-    # Make stat p90 where applicable
-    if stat in st.session_state['exclude_values_p90']:
-        div = 1
+def draw_scatter_svg(dfr, xv, yv, teams, tags):
+    # Grey markers for 'other' players, then a trace per highlighted team
+    # and player
+    df1 = dfr[~dfr['team'].isin(teams)]
+    df1 = df1[~df1['player'].isin(tags)]
+
+    figure = px.scatter(
+        df1,
+        x=xv,
+        y=yv,
+        hover_name='player',
+        hover_data='team',
+    )
+
+    # Update 'other players' markers
+    figure.update_traces(
+        marker_size=10,
+        marker_color='grey',
+        marker_line_width=1,
+        opacity=1,
+        marker_line_color='#0A0A0A',
+    )
+
+    # Plot markers from highlighted teams
+    for team in teams:
+        df1 = dfr[dfr['team'] == team]
+        figure.add_scatter(
+            x=df1[xv],
+            y=df1[yv],
+            mode='markers',
+            name=team,
+            hovertext=df1.player.to_list(),
+            legendgroup=team,
+            # Styling
+            marker_size=12,
+            marker_color=team_colours[team][0],
+            marker_line_color=team_colours[team][1],
+            marker_line_width=2.5,
+        )
+
+    # Add a marker for each highlighted player
+    for pl, tag in tags.items():
+        dff = dfr[dfr['player'] == pl]
+        figure.add_scatter(
+            x=dff[xv],
+            y=dff[yv],
+            mode='markers',
+            name=dff.team.values[0],
+            hovertext=dff.player.to_list(),
+            legendgroup=dff.team.values[0],
+            showlegend=False,
+            # Styling
+            marker_size=12,
+            marker_color=tag['marker_color'],
+            marker_line_color='red',
+        )
+
+    return figure
+
+
+def draw_scatter_gl(dfr, xv, yv, teams, tags):
+    # Every player in one WebGL trace. Team and player highlights are
+    # per-point marker arrays, so the figure does not grow with them
+    in_team = dfr['team'].isin(teams).to_numpy()
+    tagged = dfr['player'].isin(tags).to_numpy()
+
+    # Highlighted players are drawn last, on top
+    order = np.argsort(in_team + 2 * tagged, kind='stable')
+    dfr = dfr.iloc[order]
+    in_team, tagged = in_team[order], tagged[order]
+
+    n = len(dfr)
+    size = np.where(in_team | tagged, 12, 10)
+    colour = np.full(n, 'grey', dtype=object)
+    line_colour = np.full(n, '#0A0A0A', dtype=object)
+    line_width = np.where(tagged, 0, np.where(in_team, 2.5, 1))
+
+    team = dfr['team'].to_numpy()
+    for t in teams:
+        rows = in_team & (team == t)
+        colour[rows], line_colour[rows] = team_colours[t]
+
+    player = dfr['player'].to_numpy()
+    for pl, tag in tags.items():
+        rows = player == pl
+        colour[rows] = tag['marker_color']
+        line_colour[rows] = 'red'
+
+    figure = go.Figure(go.Scattergl(
+        x=dfr[xv],
+        y=dfr[yv],
+        mode='markers',
+        hovertext=player,
+        customdata=team,
+        hovertemplate=f'<b>%{{hovertext}}</b><br><br>{xv}=%{{x}}<br>'
+                      f'{yv}=%{{y}}<br>team=%{{customdata}}<extra></extra>',
+        showlegend=False,
+        marker=dict(size=size, color=colour,
+                    line=dict(color=line_colour, width=line_width)),
+    ))
+
+    # Legend entries only, without points
+    for t in teams:
+        figure.add_scattergl(
+            x=[None],
+            y=[None],
+            mode='markers',
+            name=t,
+            marker=dict(size=12, color=team_colours[t][0],
+                        line=dict(color=team_colours[t][1], width=2.5)),
+        )
+
+    figure.update_layout(xaxis_title=xv, yaxis_title=yv)
+
+    return figure
+
+
+@st.cache_resource(max_entries=32)
+def scatter_figure(_df, dataset, xv, yv, z_range, teams, markers, webgl,
+                   graph_trend, line_type):
+    # Everything but the title and player annotations, memoized so that
+    # editing those never rebuilds the traces. Keyed like the trend caches,
+    # `_df` is `dataset` filtered to `z_range`. Shared, so copy before
+    # changing it
+    tags = {pl: {'marker_color': colour} for pl, colour in markers}
+    if webgl:
+        figure = draw_scatter_gl(_df, xv, yv, teams, tags)
     else:
-        div = dataframe['90s']
+        figure = draw_scatter_svg(_df, xv, yv, teams, tags)
+
+    figure.update_layout(
+        width=800, height=500,
+        margin=dict(
+            # l=20,
+            r=40,
+            # t=20,
+            # b=20,
+        ),
+        paper_bgcolor="#050505",
+        plot_bgcolor='#131313',
+    )
+
+    # Add Trend line or add zones, from the statistics cache
+    stats_key = (dataset, xv, yv, z_range)
 
-    dataframe.loc[:, stat] = dataframe[stat] / div
+    if graph_trend == 'Trend line':
+        trend = scatter_trend(_df, *stats_key, line_type)
 
-    return dataframe
+        figure.add_trace(
+            go.Scatter(
+                x=trend['x'],
+                y=trend['y'],
+                showlegend=False,
+                mode='lines',
+                line_color='blue',
+            )
+        )
+
+    elif graph_trend == 'Zones':
+        vline_val, hline_val = scatter_zone_lines(_df, *stats_key, line_type)
+
+        # Add median line for y-axis
+        figure.add_hline(
+            y=hline_val,
+            line_dash="dot",
+            line_color="white"
+        )
+
+        # Add median line for x-axis
+        figure.add_vline(
+            x=vline_val,
+            line_dash="dot",
+            line_color="white"
+        )
+
+        # Add zone color backgrounds
+        # draw_zones(figure, _df, xv, yv, hline_val, vline_val)
+
+    return figure
 
 
 def draw_zones(figure, dfr, xv, yv, hv, vv):
@@ -108,7 +282,16 @@ team_colours = {
 }
 
 # -------------------------------- DATA ---------------------------------------
-df = st.session_state['database']
+# Shared, read-only stats of the league and season picked in the sidebar
+league, season, df = current_season()
+
+# Stats p90 where applicable, plus their PAdj versions, computed once per
+# season. Filtering gives a new frame, the shared one is never modified
+metrics = season_metrics(league, season)
+stats = metrics.columns.values[12:]
+
+# Correlation and mutual information of every pair of stats, built once
+correlations = season_correlations(league, season)
 # ------------------------------- LAYOUT --------------------------------------
 # ------------------------------ Sidebar
 
@@ -131,10 +314,26 @@ with st.sidebar.expander('Common Scatters'):
         options=[
             'Goalscoring Efficiency',
             'Assisting Efficiency',
-            'Progressive Actions'
+            'Progressive Actions',
+            'Suggested pair',
         ],
         index=0,
     )
+    # Most related pairs of the season by mutual information
+    if sc == 'Suggested pair':
+        pairs = correlations.suggest_pairs(k=20)
+        if pairs:
+            suggested = st.selectbox(
+                label='Suggested pairs',
+                options=pairs,
+                format_func=lambda pair: f'{pair[0]} v {pair[1]} '
+                                         f'(r² {pair[2]:.2f})',
+            )
+        else:
+            st.info('No pair to suggest for this season, every related '
+                    'pair is a near-duplicate. Showing Goalscoring '
+                    'Efficiency instead.')
+            sc = 'Goalscoring Efficiency'
 if sc == 'Goalscoring Efficiency':
     idx = 'npxG'
     idy = 'npG-xG'
@@ -144,19 +343,21 @@ elif sc == 'Assisting Efficiency':
 elif sc == 'Progressive Actions':
     idx = 'ProgPasses'
     idy = 'ProgCarries'
+elif sc == 'Suggested pair':
+    idx, idy = suggested[:2]
 
 # Selectbox to choose y value
 val_y = st.sidebar.selectbox(
     label='Choose value for y axis',
-    options=df.columns.values[12:],
-    index=int(np.where(df.columns.values[12:] == idy)[0][0])
+    options=stats,
+    index=int(np.where(stats == idy)[0][0])
 )
 
 # Selectbox to choose x value
 val_x = st.sidebar.selectbox(
     label='Choose value for x axis',
-    options=df.columns.values[12:],
-    index=int(np.where(df.columns.values[12:] == idx)[0][0])
+    options=stats,
+    index=int(np.where(stats == idx)[0][0])
 )
 
 # Selectbox to highlight team
@@ -173,11 +374,19 @@ graph_trend = st.sidebar.radio(
     index=1,
 )
 
+# Selectbox to choose type of trend line
+if graph_trend == 'Trend line':
+    trend_line_type = st.sidebar.selectbox(
+        label='Type of Trend Line',
+        options=TREND_TYPES,
+        index=0,
+    )
+
 # Selectbox to choose type of zone lines
 if graph_trend == 'Zones':
     zone_lines_type = st.sidebar.selectbox(
         label='Type of Zone Lines',
-        options=['Median', 'Average'],
+        options=ZONE_TYPES,
         index=1,
     )
 
@@ -188,6 +397,15 @@ st.sidebar.subheader('Format graph')
 graph_title = st.sidebar.text_input(label='Title',
                                     value='X v Y')
 
+# Above this many players the scatter is drawn with WebGL by default
+webgl_min_players = 1000
+webgl = st.sidebar.checkbox(
+    label='WebGL scatter',
+    value=len(metrics) > webgl_min_players,
+    help='Draws every player as a single WebGL trace, which stays fast with '
+         'thousands of players and many highlights.',
+)
+
 # Player annotations
 st.sidebar.divider()
 st.sidebar.subheader('Player tags')
@@ -198,10 +416,43 @@ players = st.sidebar.multiselect(
     # default='',
 )
 
-a_c = st.sidebar.color_picker('Arrow Color', value='#FFFFFF')
-st.sidebar.subheader('Edit players\' tag')
-
-df = df[(df['90s'] >= z1) & (df['90s'] <= z2)]
+# Tags are edited in a form, so typing reruns nothing until 'Apply tags'
+tags = {}
+if players:
+    with st.sidebar.form('player_tags'):
+        a_c = st.color_picker('Arrow Color', value='#FFFFFF')
+        st.subheader('Edit players\' tag')
+
+        # Elements to edit each highlighted player's annotation
+        for pl in players:
+            with st.expander(pl):
+                tags[pl] = dict(
+                    ax=st.text_input(label='ax',
+                                     value=45,
+                                     key=f'{pl}_ax'),
+                    ay=st.text_input(label='ay',
+                                     value=-30,
+                                     key=f'{pl}_ay'),
+                    text=st.text_input(label='Text',
+                                       value=pl,
+                                       key=f'{pl}_text'),
+                    show_arrow=st.radio(label='Show arrow',
+                                        options=[True, False],
+                                        key=f'{pl}_show'),
+                    x_shift=st.text_input(label='x shift',
+                                          value=0,
+                                          key=f'{pl}_xshift'),
+                    y_shift=st.text_input(label='y shift',
+                                          value=0,
+                                          key=f'{pl}_yshift'),
+                    marker_color=st.color_picker(label='Marker Color',
+                                                 value='#FFFFFF',
+                                                 key=f'{pl}_mc'),
+                )
+
+        st.form_submit_button('Apply tags')
+
+df = metrics[(metrics['90s'] >= z1) & (metrics['90s'] <= z2)]
 
 # ------------------------------ Content
 st.header(':soccer: Scatter plots')
@@ -210,193 +461,41 @@ st.divider()
 
 st.subheader('Choose x and y pairs')
 
-# ------------------------------ Scatter 1 ------------------------------------
-# val_x = 'npxG'
-# val_y = 'CarriesToFinalThird'
-df = make_p90(df, val_x)
-df = make_p90(df, val_y)
-
-# fig = go.Figure()
-
-# Draw 'other' player markers
-
-df1 = df[~df['team'].isin(teams)]
-df1 = df1[~df['player'].isin(players)]
-
-fig = px.scatter(
-    df1,
-    x=val_x,
-    y=val_y,
-    # customdata=np.stack([df['player']]),
-    # name=customdata[0],
-    hover_name='player',
-    hover_data='team',
-    width=800, height=500,
-)
-
-fig.update_layout(
-    margin=dict(
-        # l=20,
-        r=40,
-        # t=20,
-        # b=20,
-    ),
-    paper_bgcolor="#050505",
-    plot_bgcolor='#131313',
-)
-
-# Update 'other players' markers
-fig.update_traces(
-    marker_size=10,
-    marker_color='grey',
-    marker_line_width=1,
-    opacity=1,
-    marker_line_color='#0A0A0A',
-)
-
-# Plot markers from highlighted teams
-if teams:
-    for team in teams:
-        df1 = df[df['team'] == team]
-        fig = fig.add_scatter(
-            x=df1[val_x],
-            y=df1[val_y],
-            mode='markers',
-            name=team,
-            hovertext=df1.player.to_list(),
-            legendgroup=team,
-            # Styling
-            marker_size=12,
-            marker_color='white',
-            marker_line_color='red',
-            # marker_symbol='x',
-            # marker_opacity=0.5,
-            # opacity=0.5,
-        )
-
-# Update markers from highlighted teams
-if teams:
-    for team in teams:
-        fig = fig.update_traces(
-            selector={'legendgroup': team},
-            # marker_color='red',
-            marker_line_color=team_colours[team][1],
-            marker_color=team_colours[team][0],
-            marker_line_width=2.5,
-        )
+st.caption(f'{val_x} v {val_y}: '
+           f'r² {correlations.r2(val_x, val_y):.2f}, '
+           f'mutual information {correlations.mutual_info(val_x, val_y):.2f} '
+           f'(players with {MIN_90S}+ 90s)')
 
-# Highlight players and add sidebar elements to edit each annotation
-if players:
-    for pl in players:
-        with st.sidebar.expander(pl):
-            ax = st.text_input(label='ax',
-                               value=45,
-                               key=f'{pl}_ax')
-
-            ay = st.text_input(label='ay',
-                               value=-30,
-                               key=f'{pl}_ay')
-
-            t = st.text_input(label='Text',
-                              value=pl,
-                              key=f'{pl}_text')
-
-            show_a = st.radio(label='Show arrow',
-                              options=[True, False],
-                              key=f'{pl}_show')
-            x_s = st.text_input(label='x shift',
-                                value=0,
-                                key=f'{pl}_xshift')
-            y_s = st.text_input(label='y shift',
-                                value=0,
-                                key=f'{pl}_yshift')
-            marker_c = st.color_picker(label='Marker Color',
-                                       value='#FFFFFF',
-                                       key=f'{pl}_mc')
-
-        # Create temporary dataset for highlighted player
-        dff = df[df['player'] == pl]
-        x = dff[val_x].values[0]
-        y = dff[val_y].values[0]
-
-        # Add a marker for each player
-        fig = fig.add_scatter(
-            x=dff[val_x],
-            y=dff[val_y],
-            mode='markers',
-            name=dff.team.values[0],
-            hovertext=dff.player.to_list(),
-            legendgroup=dff.team.values[0],
-            showlegend=False,
-            # Styling
-            marker_size=12,
-            marker_color=marker_c,
-            marker_line_color='red',
-            # marker_symbol='x',
-            # marker_opacity=0.5,
-            # opacity=0.5,
-        )
-
-        fig.add_annotation(
-            x=x,
-            y=y,
-            ax=ax,
-            ay=ay,
-            text=t,
-            arrowcolor=a_c,
-            arrowsize=0.3,
-            showarrow=show_a,
-            xshift=float(x_s),
-            yshift=float(y_s),
-        )
-
-# Add Trend line or add zones
+# ------------------------------ Scatter 1 ------------------------------------
+# Markers, highlights and the trend line or zones come from the figure
+# cache. Title and tag edits only copy it and add the annotations
+markers = tuple((pl, tag['marker_color']) for pl, tag in tags.items())
 if graph_trend == 'Trend line':
-    fit_results = sm.OLS(
-        df[val_y].values,
-        sm.add_constant(df[val_x].values),
-        missing="drop"
-    ).fit()
-
-    trend_y = fit_results.predict()
-
-    fig = fig.add_trace(
-        go.Scatter(
-            x=df[val_x],
-            y=trend_y,
-            showlegend=False,
-            mode='lines',
-            line_color='blue',
-        )
-    )
-
-elif graph_trend == 'Zones':
-
-    if zone_lines_type == 'Median':
-        hline_val = np.median(df[val_y])
-        vline_val = np.median(df[val_x])
-
-    elif zone_lines_type == 'Average':
-        hline_val = np.average(df[val_y])
-        vline_val = np.average(df[val_x])
-
-    # Add median line for y-axis
-    fig.add_hline(
-        y=hline_val,
-        line_dash="dot",
-        line_color="white"
-    )
-
-    # Add median line for x-axis
-    fig.add_vline(
-        x=vline_val,
-        line_dash="dot",
-        line_color="white"
+    line_type = trend_line_type
+else:
+    line_type = zone_lines_type
+
+fig = go.Figure(scatter_figure(df, (league, season), val_x, val_y, (z1, z2),
+                               tuple(teams), markers, webgl,
+                               graph_trend, line_type))
+
+# Annotate highlighted players
+for pl, tag in tags.items():
+    dff = df[df['player'] == pl]
+
+    fig.add_annotation(
+        x=dff[val_x].values[0],
+        y=dff[val_y].values[0],
+        ax=tag['ax'],
+        ay=tag['ay'],
+        text=tag['text'],
+        arrowcolor=a_c,
+        arrowsize=0.3,
+        showarrow=tag['show_arrow'],
+        xshift=float(tag['x_shift']),
+        yshift=float(tag['y_shift']),
     )
 
-    # Add zone color backgrounds
-    # draw_zones(fig, df, val_x, val_y, hline_val, vline_val)
-
 fig.update_layout(
     title_text=graph_title,
     title_font_size=30,
@@ -407,6 +506,3 @@ fig.update_layout(
 st.plotly_chart(fig)
 
 st.divider()
-
-st.text('TO-DO\n'
-        '- Make stats PAdj\n')
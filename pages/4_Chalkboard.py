@@ -1,13 +1,20 @@
 import streamlit as st
-import pandas as pd
 import numpy as np
 import matplotlib.image as mpimg
-from mplsoccer import Pitch, VerticalPitch, Standardizer
 
 import io
-import matplotlib.pyplot as plt
-from PIL import Image
-from urllib.request import urlopen
+from matplotlib.colors import LinearSegmentedColormap
+from matplotlib.figure import Figure
+
+from assets import team_crest
+from event_store import (OPTA_TO_STATSBOMB, cached_player_stats, in_zone,
+                         load_events, opta_band)
+from export import export_controls, show_download
+from heatmaps import (BIN_TYPES, HEX_EXTENT, HEX_GRIDSIZE, binned_events,
+                      hex_centres, rect_stats)
+from image_cache import figure_to_png, image_cache
+from pitch_cache import draw_pitch, pitch_grid, pitch_template
+from zones import PENALTY_BOX
 
 # """
 # mplsoccer uses Statsbomb pitch
@@ -61,9 +68,11 @@ def replace_thirds(val):
 #         return (100 - vals) / 100 * 80
 
 
-def plot_attacking(ax):
-
-    pitch = Pitch(
+def attacking_template():
+    """ Cached Team Attack pitch. Resolve it on the script thread and pass it
+    to `draw_team_attack`, never from an export worker. """
+    return pitch_template(
+        'Pitch',
         # axis=True,
         # label=True,
         # tick=True,
@@ -82,21 +91,184 @@ def plot_attacking(ax):
         pad_bottom=0,
     )
 
+
+def plot_attacking(ax, template, exact=False):
+    """ Draw a Team Attack pitch from `template` on `ax`. The markings come
+    from the cached pitch background unless `exact` (vector lines, for
+    exports). """
+    pitch = template.pitch
+
     ax.set_facecolor(pitch_bg_color)
-    pitch.draw(ax=ax)
+    if exact:
+        pitch.draw(ax=ax)
+    else:
+        draw_pitch(ax, template, dpi=screen_dpi)
 
     # Figure background color
-    fig.patch.set_facecolor(fig_bg_color)
+    ax.figure.patch.set_facecolor(fig_bg_color)
 
     return pitch
 
 
-# Standardizer
-standard = Standardizer(pitch_from='opta', pitch_to='statsbomb')
+def draw_team_attack(pdf, template, exact=False):
+    """ Team Attack Contribution grid from the team passes in `pdf`, on
+    `attacking_template` pitches. Built on a plain Figure (no pyplot) so
+    exports can run it on a background worker, `exact` draws vector pitches
+    for print. """
+    fig = Figure(figsize=(20, 18))
+    axs = fig.subplots(nrows=4, ncols=5)
+
+    # Adjust before drawing so cached pitch backgrounds match the final size
+    fig.subplots_adjust(
+        left=0.05,
+        right=0.95,
+        bottom=0,
+        wspace=.1,
+        hspace=-0.5,
+    )
+
+    for index, ax in enumerate(axs.reshape(-1)):
+        pitch = plot_attacking(ax, template, exact)
+
+    # Title axes stretches fig to full width
+    # dimensions(left, bottom, width, height) of new axes.
+    # In fractions of fig w and h
+    title_ax = fig.add_axes(
+        [0, 0.8, 1, 0.1]
+    )
+
+    title_ax.axis('off')
+
+    # Bottom-margin
+    fig.text(
+        x=0.5, y=0.09,
+        s='o',
+        c=fig_bg_color,
+    )
+
+    title = title_ax.text(
+        x=0.5, y=0.8,
+        s="WHICH TEAMS ARE GETTING BETTER AT PROGRESSING THE BALL?",
+        va="top", ha="center",
+        fontsize=25,
+        color="black",
+        # font="DM Sans",
+        weight="bold"
+    )
+
+    # --------------------------- Filter Data
+    # --- General filter for all 5 columns
+    # Done by the caller: team, opposition and passes only
+
+    # --- First Column - Passes into Final 3rd
+    pdf1 = pdf[in_zone(pdf, opta_band(2/3 * 100, 100), 'end')]
+
+    # --- Second Column - Carries into Final 3rd
+    # --- Third Column - Passes into Pen Box
+
+    # Filter by penalty box coordinates
+    pdf3 = pdf[in_zone(pdf, PENALTY_BOX, 'end')]
+
+
+    # --- Fourth Column - Carries into Pen Box
+
+    # --- Fifth Column - Passes in Pen Box
+
+    # --------------------------- Plot Events
+
+    # --- Third Column - Passes into Pen Box
+    lw = 1
+    mw1 = 1
+
+    # Get top 5 players with most  successful passes
+    pdf_f = pdf3[pdf3['outcome_type'] == 'Successful']
+    top = pdf_f[['player', 'type']].groupby(['player'], observed=True).agg(
+        'count')
+    top = top.sort_values(by=['type'], ascending=False).head().index.to_list()
+
+    for i, player in enumerate(top):
+
+        # Filter by player
+        pdf = pdf3[pdf3['player'] == player]
+        # Unsuccessful Passes
+        pdfu = pdf[pdf['outcome_type'] == 'Unsuccessful']
+        xstart, ystart = pdfu['sb_x'], pdfu['sb_y']
+        xend, yend = pdfu['sb_end_x'], pdfu['sb_end_y']
+
+        axs[2][i].text(
+            x=60, y=-5,
+            s=f'{player}',
+            ha='center',
+            va='bottom'
+        )
+
+        pitch.lines(
+            xstart=xstart,
+            ystart=ystart,
+            xend=xend,
+            yend=yend,
+            comet=is_line_transparent,
+            # color='#c1c1bf', # BenGriffis gray
+            color=event2_marker_color1,
+            ax=axs[2][i],
+            lw=lw,
+            label=f'55'
+                  f' missed',
+
+            transparent=is_line_transparent,
+            alpha_start=line_alpha_start2,
+            alpha_end=line_alpha_end2,
+        )
+
+        pitch.scatter(
+            x=xend,
+            y=yend,
+            ax=axs[2][i],
+            s=mw1,
+            # linewidth=0,
+            marker='o',
+            facecolor=event2_marker_color1,
+        )
+
+        # Successful Passes
+        pdfs = pdf[pdf['outcome_type'] == 'Successful']
+        xstart, ystart = pdfs['sb_x'], pdfs['sb_y']
+        xend, yend = pdfs['sb_end_x'], pdfs['sb_end_y']
+
+        pitch.lines(
+            xstart=xstart,
+            ystart=ystart,
+            xend=xend,
+            yend=yend,
+            comet=True,
+            color=event1_marker_color1,
+            ax=axs[2][i],
+            lw=lw,
+            label=f'50',
+            transparent=is_line_transparent,
+            alpha_start=line_alpha_start2,
+            alpha_end=line_alpha_end2,
+        )
+
+        pitch.scatter(
+            x=xend,
+            y=yend,
+            ax=axs[2][i],
+            s=mw1,
+            marker='o',
+            facecolor=event1_marker_color2,
+            # facecolor='#ef4146',
+            zorder=2,
+        )
+
+    return fig
+
+
 
 # -------------------------------- LOAD DATA ----------------------------------
-df = pd.read_csv('data/2324_events.csv')
-df = df.iloc[:, 1:]
+events = load_events('data/2324_events.csv')
+# Append any matchweek added since the store was loaded
+events.refresh()
 
 # ------------------------------- DASHBOARD  ----------------------------------
 # ---------------------------- SIDEBAR FILTERS --------------------------------
@@ -104,26 +276,23 @@ df = df.iloc[:, 1:]
 # Selectbox to highlight team
 team = st.sidebar.selectbox(
     label='Select teams',
-    options=df.team.sort_values().unique(),
-    index=int(np.where(df.team.sort_values().unique() == 'Chelsea')[0][0]),
+    options=events.teams(),
+    index=events.teams().index('Chelsea'),
 )
 
 # Selectbox to choose players of interest
 players = st.sidebar.multiselect(
     label='Select players',
-    options=df[df['team'] == team].player.dropna().sort_values().unique(),
-    default=df[df['team'] == team].player.dropna().sort_values().unique()[10],
+    options=events.players(team),
+    default=events.players(team)[10],
 )
 
 # Filter by actions against opposing team
 # Local teams when away is the team of interest PLUS
 # away teams when local is team of interest
-rivals_opt = df.loc[df['home'] == team, 'away'].unique().tolist()
-rivals_opt += df.loc[df['away'] == team, 'home'].unique().tolist()
-rivals_opt.sort()
 rivals = st.sidebar.multiselect(
     label='Select rivals',
-    options=rivals_opt,
+    options=events.rivals(team),
     # default=['Liverpool']
 )
 
@@ -138,15 +307,9 @@ if event == 'Pass':
     # Granular filter by pitch length
     l1, l2 = st.sidebar.select_slider(
         label='Select Pass Length (m)',
-        # Not eliminating the NAN messed up the sorting
-        options=sorted(df[df['length'].notna()].loc[:, 'length'].unique()),
-        # options=sorted(df['length'].unique()),
-        value=(np.min(df['length'].dropna().unique()),
-               np.max(df['length'].dropna().unique())
-               )
+        options=events.pass_lengths,
+        value=(events.pass_lengths[0], events.pass_lengths[-1])
     )
-    # Filtering occurs here
-    df = df[(df['length'] >= l1) & (df['length'] <= l2)]
 
 # Filter by Starting Pitch Zone
 x1, x2 = st.sidebar.select_slider(
@@ -166,95 +329,72 @@ end_x1, end_x2 = st.sidebar.select_slider(
 end_x1 = replace_thirds(end_x1)
 end_x2 = replace_thirds(end_x2)
 
+# Above this many passes on one pitch the lines are replaced by a flow map,
+# unless 'Exact render' is ticked
+lod_max_passes = 500
+exact_render = st.sidebar.checkbox(
+    label='Exact render (every pass line)',
+    value=False,
+    help=f'Pitches with more than {lod_max_passes} passes are drawn as a '
+         f'flow map to stay readable and fast.',
+)
+
 if len(players) > 0:
     title_text = st.sidebar.text_input(
         label='Figure Title',
         value=f'{players[0]} Passes'
     )
 
+# Identifies the current filter selection and the team's data version, so
+# cached results are dropped when a matchweek adds events for the team.
+# Images whose subtitle shows the latest matchweek also key on it
+filter_key = (team, events.team_version(team), tuple(rivals), event,
+              (l1, l2) if event == 'Pass' else None,
+              x1, x2, end_x1, end_x2)
+
 title_text2 = st.sidebar.text_input(
     label='2nd Figure Title',
     value=f'{team} Passes Into Final Third'
 )
 # ------------------------------ FILTER DATA ----------------------------------
-# Filter by team
-plot_df = df[df['team'] == team]
-
-# Filter only actions against selected teams
-plot_df = plot_df[
-    ((plot_df['home'] == team) & (plot_df['away'].isin(rivals)))
-    |
-    ((plot_df['home'].isin(rivals)) & (plot_df['away'] == team))
-    ]
-# Filter by type of event
-plot_df = plot_df[plot_df['type'] == event]
-
-# Length filtering occurs at after the length slider code as that slider
-# is conditional and might not appear all the time.
-# Filtering pseudo-code for reference;
-# and (df['length'] >= l1) and (df['length'] <= l2)
+# Filter by team, only actions against selected teams, by type of event and
+# by starting and receiving pitch zones
+plot_df = events.select(team, rivals, event,
+                        start_zone=opta_band(x1, x2),
+                        end_zone=opta_band(end_x1, end_x2))
 
-# Filter by Starting Pitch Zone
-
-plot_df = plot_df[
-    (plot_df['x'] >= x1)
-    & (plot_df['x'] <= x2)
-    ]
-
-# Filter by Receiving Pitch Zone
-plot_df = plot_df[
-    (plot_df['end_x'] >= end_x1)
-    & (plot_df['end_x'] <= end_x2)
-    ]
+# Filter by pass length, the slider only appears for passes
+if event == 'Pass':
+    plot_df = plot_df[(plot_df['length'] >= l1) & (plot_df['length'] <= l2)]
 
 # Dataframe used for showing table and for multi-player plot
 team_df = plot_df[['player', 'type', 'outcome_type',
-                   'x', 'y', 'end_x', 'end_y']]
+                   'x', 'y', 'end_x', 'end_y',
+                   'sb_x', 'sb_y', 'sb_end_x', 'sb_end_y']]
 # FILTERING BY PLAYER IS DONE LAST SO WE CAN GET THE FILTERED DF OF ALL PLAYERS
 # Filter by player
 plot_df = plot_df[plot_df['player'].isin(players)]
 
 # ------------------------- COUNT DATA
-# --- Dataframe with team events
-
-# Count and get % of total
-team_events = team_df.count()['player']
-# Successful - Count
-scc_team = team_df[team_df['outcome_type'] == 'Successful'].count()['player']
-# Unsuccessful
-fail_team = team_df[team_df['outcome_type'] == 'Unsuccessful'].count()[
-    'player']
-
-# --- Dataframe with only player events
-player_df = {}
-player_events = {}
-p = {}
-scc_player = {}
-player_cmp = {}
-fail_player = {}
-for player in players:
-    player_df[player] = team_df[team_df['player'] == player]
-    # Count and get % of total
-    player_events[player] = player_df[player].count()['player']
-    p[player] = round(player_events[player] / team_events * 100, 1)
-
-    # Successful - Count
-    scc_player[player] = \
-    player_df[player][team_df['outcome_type'] == 'Successful'].count()[
-        'player']
-
-    player_cmp[player] = round(
-        scc_player[player] / player_events[player] * 100, 1)
-
-    # Unsuccessful
-
-    fail_player[player] = \
-    player_df[player][team_df['outcome_type'] == 'Unsuccessful'].count()[
-        'player']
+# Per-player counts of every team player at once, cached by the data so the
+# cost doesn't depend on how many players are selected
+team_stats = cached_player_stats(team_df)
+
+# --- Team events
+team_events = team_stats['events'].sum()
+scc_team = team_stats['successful'].sum()
+fail_team = team_stats['unsuccessful'].sum()
+
+# --- Selected players, zero for players without events
+player_stats = team_stats.reindex(players, fill_value=0)
+player_events = player_stats['events']
+p = player_stats['share']
+scc_player = player_stats['successful']
+player_cmp = player_stats['completion']
+fail_player = player_stats['unsuccessful']
 
 # ------------------ SORT TOP 5 PLAYERS
-top = team_df[['player', 'type']].groupby(['player']).agg('count')
-top = top.sort_values(by=['type'], ascending=False).head()
+top = team_stats[['events']].sort_values(by='events', ascending=False).head()
 
 # ------------------------------- MAIN PAGE  ----------------------------------
 
@@ -294,9 +434,10 @@ st.divider()
 # ------------------------------ FORMAT PLOT ----------------------------------
 # -------------------------- EDIT/CHANGE PARAMETERS
 
-image_url = 'https://cdn5.wyscout.com/photos/team/public/25_120x120.png'
-
 # Figure
+# Resolution of figures shown on the page (exports pick their own)
+screen_dpi = 100
+
 # Pitch Padding
 pitch_left_pad = 0
 pitch_right_pad = 0
@@ -348,7 +489,8 @@ subtitle1_ha = 'center'
 subtitle1_va = 'center'
 subtitle1_size = 12
 
-subtitle1_text = f"23/24 Season | Premier League | As of Matchweek 12"
+subtitle1_text = f"23/24 Season | Premier League | " \
+                 f"As of Matchweek {events.matchweek}"
 
 subtitle1_color = "#030303"
 
@@ -405,7 +547,8 @@ title_ha2 = 'left'
 title_va2 = 'top'
 
 # Subtitle
-subtitle1_text2 = f'23/24 Premier League | As of Matchweek 12 | ' \
+subtitle1_text2 = f'23/24 Premier League | ' \
+                  f'As of Matchweek {events.matchweek} | ' \
                   f'Top 3 Players with Most Attempted Passes Into Final 3rd'
 subtitle_size2 = 16
 
@@ -456,372 +599,401 @@ is_line_transparent = True
 line_alpha_start2 = 0.1
 line_alpha_end2 = 0.3
 
-# ----------------------------- SETUP FIGURE
 
-# Tabs for stats select
-tab_one, tab_two, tab_three, tab_four = st.tabs([
-    "One Player",
-    "Three Players",
-    "Inside Final 3rd",
-    "Team Attack Contribution",
-]
-)
-with tab_one:
-    if len(players) == 0:
-        st.caption('This viz requires at least 1 player selected.')
-    else:
-        pitch = VerticalPitch(
-            # axis=True,
-            # label=True,
-            # tick=True,
-            goal_type='box',
-            line_color=pitch_line_color,
-            # line_alpha=0.5,
-            linewidth=pitch_line_width,
-
-            # bring the left axis in 10 data units (reduce the size)
-            pad_left=pitch_left_pad,
-            # bring the right axis in 10 data units (reduce the size)
-            pad_right=pitch_right_pad,
-            # extend the top axis 10 data units
-            pad_top=pitch_top_ad,
-            # extend the bottom axis 20 data units
-            pad_bottom=pitch_bottom_pad,
-        )
+# --------------------------- LEVEL OF DETAIL ---------------------------------
+flow_bins = (4, 6)  # across, along the pitch
+flow_arrow_length = 8
 
-        fig, axs = pitch.grid(
-            nrows=1, ncols=1,
-            # figheight=10,
-
-            title_height=title_h,  # the title takes up 15% of the fig height
-            grid_height=grid_h,  # the grid takes up 71.5% of the figure height
-            endnote_height=endnote_h,  # endnote takes up 6.5% of the figure height
-            #
-            grid_width=grid_w,  # gris takes up 95% of the figure width
-            #
-            # # 1% of fig height is space between pitch and title
-            title_space=title_space,
-            #
-            # # 1% of fig height is space between pitch and endnote
-            endnote_space=endnote_space,
-            #
-            space=space,  # 5% of grid_height is reserved for space between axes
-            #
-            # # centers the grid horizontally / vertically
-            left=left_p,
-            bottom=None,
-            axis=False,
-        )
 
-        # ------------ Add 3rds Lines
-        y, _ = standard.transform([1 / 3 * 100, 2 / 3 * 100], [0, 0])
+def use_flow(pdf):
+    """ Whether the passes in `pdf` are drawn as a flow map. """
+    return event == 'Pass' and not exact_render and len(pdf) > lod_max_passes
 
-        axs['pitch'].hlines(
-            y=y,
-            xmin=-3,
-            xmax=83,
-            colors='black',
-            linestyles='dashed',
-            alpha=0.5,
-            clip_on=False,
-        )
-
-        # Figure background color
-        fig.patch.set_facecolor(fig_bg_color)
-        # Pitch background color
-        axs['pitch'].set_facecolor(pitch_bg_color)
-
-        # Add title
-        axs['title'].text(
-            x=title_x,
-            y=title_y,
-            s=title_text,
-            size=title_size,
-            ha=title_ha,
-            va=title_va,
-        )
 
-        # Add subtitle 1
-        axs['title'].text(
-            x=subtitle1_x,
-            y=subtitle1_y,
-            s=subtitle1_text,
-            size=subtitle1_size,
-            ha=subtitle1_ha,
-            va=subtitle1_va,
-            # fontproperties=font_bold.prop,
-            color=subtitle1_color,
-        )
+def draw_pass_flow(pitch, ax, pdf, label=None):
+    """ Stand-in for the pass lines of `pdf` whose cost doesn't grow with
+    the passes: a heatmap of where they start and an arrow per zone with
+    their mean direction. """
+    stats = pitch.bin_statistic(pdf['sb_x'], pdf['sb_y'], statistic='count',
+                                bins=flow_bins[::-1])
+    # under the pitch markings
+    pitch.heatmap(stats, ax=ax, cmap=heatmap_cmap,
+                  edgecolors=pitch_bg_color, zorder=0.8)
+    pitch.flow(pdf['sb_x'], pdf['sb_y'], pdf['sb_end_x'], pdf['sb_end_y'],
+               bins=flow_bins[::-1], arrow_type='scale',
+               arrow_length=flow_arrow_length, color=pitch_line_color,
+               headwidth=3, headlength=3, headaxislength=3,
+               label=label, ax=ax)
 
-        # # Add subtitle 2
-        # axs['title'].text(
-        #     x=subtitle2_x,
-        #     y=subtitle2_y,
-        #     s=subtitle2_text,
-        #     size=subtitle2_size,
-        #     ha=subtitle2_ha,
-        #     va=subtitle2_va,
-        #     # fontproperties=font_bold.prop,
-        #     color=subtitle2_color,
-        # )
 
-        # axs['pitch'].set_ylabel('Undamped')
-        # axs['pitch'].set_axis = True
+def draw_one_player(plot_df):
+    """ Passes of the first selected player in `plot_df`. """
+    template = pitch_template(
+        'VerticalPitch',
+        # axis=True,
+        # label=True,
+        # tick=True,
+        goal_type='box',
+        line_color=pitch_line_color,
+        # line_alpha=0.5,
+        linewidth=pitch_line_width,
 
-        # Draw passes
-        if event == 'Pass':
-            # Unsuccessful Passes
-            pdf = plot_df[plot_df['outcome_type'] == 'Unsuccessful']
-            xstart, ystart = standard.transform(pdf['x'], pdf['y'])
-            xend, yend = standard.transform(pdf['end_x'], pdf['end_y'])
+        # bring the left axis in 10 data units (reduce the size)
+        pad_left=pitch_left_pad,
+        # bring the right axis in 10 data units (reduce the size)
+        pad_right=pitch_right_pad,
+        # extend the top axis 10 data units
+        pad_top=pitch_top_ad,
+        # extend the bottom axis 20 data units
+        pad_bottom=pitch_bottom_pad,
+    )
+    pitch = template.pitch
+
+    # Pitch markings come from the cached background
+    fig, axs = pitch_grid(
+        template,
+        nrows=1, ncols=1,
+        # figheight=10,
+
+        title_height=title_h,  # the title takes up 15% of the fig height
+        grid_height=grid_h,  # the grid takes up 71.5% of the figure height
+        endnote_height=endnote_h,  # endnote takes up 6.5% of the figure height
+        #
+        grid_width=grid_w,  # gris takes up 95% of the figure width
+        #
+        # # 1% of fig height is space between pitch and title
+        title_space=title_space,
+        #
+        # # 1% of fig height is space between pitch and endnote
+        endnote_space=endnote_space,
+        #
+        space=space,  # 5% of grid_height is reserved for space between axes
+        #
+        # # centers the grid horizontally / vertically
+        left=left_p,
+        bottom=None,
+        axis=False,
+    )
 
-            pitch.lines(
-                xstart=xstart,
-                ystart=ystart,
-                xend=xend,
-                yend=yend,
-                comet=is_line_transparent,
-                # color='#c1c1bf', # BenGriffis gray
-                color=event2_marker_color1,
-                ax=axs['pitch'],
-                lw=event_line_width1,
-                label=label2,
-                transparent=is_line_transparent,
-                alpha_start=line_alpha_start,
-                alpha_end=line_alpha_end,
-            )
+    # ------------ Add 3rds Lines
+    y, _ = OPTA_TO_STATSBOMB.transform([1 / 3 * 100, 2 / 3 * 100], [0, 0])
+
+    axs['pitch'].hlines(
+        y=y,
+        xmin=-3,
+        xmax=83,
+        colors='black',
+        linestyles='dashed',
+        alpha=0.5,
+        clip_on=False,
+    )
 
-            pitch.scatter(
-                x=xend,
-                y=yend,
-                ax=axs['pitch'],
-                s=event_marker_width1,
-                linewidth=0,
-                marker='o',
-                facecolor=event2_marker_color1,
-            )
+    # Figure background color
+    fig.patch.set_facecolor(fig_bg_color)
+    # Pitch background color
+    axs['pitch'].set_facecolor(pitch_bg_color)
+
+    # Add title
+    axs['title'].text(
+        x=title_x,
+        y=title_y,
+        s=title_text,
+        size=title_size,
+        ha=title_ha,
+        va=title_va,
+    )
 
-            # Successful Passes
-            pdf = plot_df[plot_df['outcome_type'] == 'Successful']
-            xstart, ystart = standard.transform(pdf['x'], pdf['y'])
-            xend, yend = standard.transform(pdf['end_x'], pdf['end_y'])
+    # Add subtitle 1
+    axs['title'].text(
+        x=subtitle1_x,
+        y=subtitle1_y,
+        s=subtitle1_text,
+        size=subtitle1_size,
+        ha=subtitle1_ha,
+        va=subtitle1_va,
+        # fontproperties=font_bold.prop,
+        color=subtitle1_color,
+    )
 
-            pitch.lines(
-                xstart=xstart,
-                ystart=ystart,
-                xend=xend,
-                yend=yend,
-                comet=True,
-                color=event1_marker_color1,
-                ax=axs['pitch'],
-                lw=event_line_width1,
-                label=label1,
-                transparent=is_line_transparent,
-                alpha_start=line_alpha_start,
-                alpha_end=line_alpha_end,
-            )
+    # # Add subtitle 2
+    # axs['title'].text(
+    #     x=subtitle2_x,
+    #     y=subtitle2_y,
+    #     s=subtitle2_text,
+    #     size=subtitle2_size,
+    #     ha=subtitle2_ha,
+    #     va=subtitle2_va,
+    #     # fontproperties=font_bold.prop,
+    #     color=subtitle2_color,
+    # )
+
+    # axs['pitch'].set_ylabel('Undamped')
+    # axs['pitch'].set_axis = True
+
+    # Draw passes, as a flow map when there are too many to read
+    if use_flow(plot_df):
+        draw_pass_flow(pitch, axs['pitch'], plot_df,
+                       label=f'{len(plot_df)} passes, mean direction per zone')
+    elif event == 'Pass':
+        # Unsuccessful Passes
+        pdf = plot_df[plot_df['outcome_type'] == 'Unsuccessful']
+        xstart, ystart = pdf['sb_x'], pdf['sb_y']
+        xend, yend = pdf['sb_end_x'], pdf['sb_end_y']
 
-            pitch.scatter(
-                x=xend,
-                y=yend,
-                ax=axs['pitch'],
-                s=event_marker_width1,
-                marker='o',
-                facecolor=event1_marker_color1,
-            )
+        pitch.lines(
+            xstart=xstart,
+            ystart=ystart,
+            xend=xend,
+            yend=yend,
+            comet=is_line_transparent,
+            # color='#c1c1bf', # BenGriffis gray
+            color=event2_marker_color1,
+            ax=axs['pitch'],
+            lw=event_line_width1,
+            label=label2,
+            transparent=is_line_transparent,
+            alpha_start=line_alpha_start,
+            alpha_end=line_alpha_end,
+        )
 
-        # # Add 'Middle 3rd' and 'Final 3rd' Labels
-        # props = dict(
-        #     boxstyle='round, pad=0.9',
-        #     facecolor=fig_bg_color,
-        #     alpha=0.5
-        # )
+        pitch.scatter(
+            x=xend,
+            y=yend,
+            ax=axs['pitch'],
+            s=event_marker_width1,
+            linewidth=0,
+            marker='o',
+            facecolor=event2_marker_color1,
+        )
 
-        # axs['pitch'].add_patch(Rectangle((1, 1), 2, 6,
-        #              edgecolor = 'pink',
-        #              facecolor = 'blue',
-        #              fill=True,
-        #              lw=5)
-        #                        )
-
-        # axs['pitch'].text(
-        #     x=83,
-        #     y=68,
-        #     s='Middle 3rd',
-        #     rotation=270,
-        #     size=15,
-        #     verticalalignment='top',
-        #     # bbox=props,
-        # )
+        # Successful Passes
+        pdf = plot_df[plot_df['outcome_type'] == 'Successful']
+        xstart, ystart = pdf['sb_x'], pdf['sb_y']
+        xend, yend = pdf['sb_end_x'], pdf['sb_end_y']
 
-        # ------------ Add Legend
-        legend = axs['pitch'].legend(
-            facecolor=legend_bg_color,
-            # handlelength=5,
-            edgecolor=legend_edge_color,
-            # prop=robotto_regular.prop,
-            labelcolor=legend_text_color,
-            framealpha=legend_alpha,
-            loc=legend_ref,
-            bbox_to_anchor=legend_loc,
+        pitch.lines(
+            xstart=xstart,
+            ystart=ystart,
+            xend=xend,
+            yend=yend,
+            comet=True,
+            color=event1_marker_color1,
+            ax=axs['pitch'],
+            lw=event_line_width1,
+            label=label1,
+            transparent=is_line_transparent,
+            alpha_start=line_alpha_start,
+            alpha_end=line_alpha_end,
         )
 
-        # ------------ Add Credits
-        axs['pitch'].text(
-            79,
-            119,
-            '@DGCFutbol',
-            va='top',
-            ha='right',
-            fontsize=13,
-            weight='bold',
-            # ontproperties=robotto_regular.prop,
-            color='#030303',
-            alpha=0.3,
+        pitch.scatter(
+            x=xend,
+            y=yend,
+            ax=axs['pitch'],
+            s=event_marker_width1,
+            marker='o',
+            facecolor=event1_marker_color1,
         )
 
-        # DRAW FIG
-        st.pyplot(fig)
+    # # Add 'Middle 3rd' and 'Final 3rd' Labels
+    # props = dict(
+    #     boxstyle='round, pad=0.9',
+    #     facecolor=fig_bg_color,
+    #     alpha=0.5
+    # )
+
+    # axs['pitch'].add_patch(Rectangle((1, 1), 2, 6,
+    #              edgecolor = 'pink',
+    #              facecolor = 'blue',
+    #              fill=True,
+    #              lw=5)
+    #                        )
+
+    # axs['pitch'].text(
+    #     x=83,
+    #     y=68,
+    #     s='Middle 3rd',
+    #     rotation=270,
+    #     size=15,
+    #     verticalalignment='top',
+    #     # bbox=props,
+    # )
+
+    # ------------ Add Legend
+    legend = axs['pitch'].legend(
+        facecolor=legend_bg_color,
+        # handlelength=5,
+        edgecolor=legend_edge_color,
+        # prop=robotto_regular.prop,
+        labelcolor=legend_text_color,
+        framealpha=legend_alpha,
+        loc=legend_ref,
+        bbox_to_anchor=legend_loc,
+    )
+
+    # ------------ Add Credits
+    axs['pitch'].text(
+        79,
+        119,
+        '@DGCFutbol',
+        va='top',
+        ha='right',
+        fontsize=13,
+        weight='bold',
+        # ontproperties=robotto_regular.prop,
+        color='#030303',
+        alpha=0.3,
+    )
 
-# -------------------------- SETUP MULTIGRID FIGURE
-with tab_two:
-    if len(players) != 3:
-        st.caption('This viz requires only 3 players selected.')
-    else:
-        pitch2 = VerticalPitch(
-            # axis=True,
-            # label=True,
-            # tick=True,
-            goal_type='box',
-            line_color=pitch_line_color,
-            # line_alpha=0.5,
-            linewidth=pitch_line_width * 2,
-
-            # bring the left axis in 10 data units (reduce the size)
-            pad_left=pitch_left_pad,
-            # bring the right axis in 10 data units (reduce the size)
-            pad_right=pitch_right_pad,
-            # extend the top axis 10 data units
-            pad_top=pitch_top_ad,
-            # extend the bottom axis 20 data units
-            pad_bottom=-8,
-        )
+    return fig
 
-        fig2, axs2 = pitch2.grid(
-            nrows=1, ncols=len(players),
-            figheight=10,
 
-            title_height=0.15,  # the title takes up 15% of the fig height
-            grid_height=0.7,  # the grid takes up 71.5% of the figure height
-            endnote_height=0.03,  # endnote takes up 6.5% of the figure height
+def draw_three_players(team_df):
+    """ Side by side passes of the three selected players. """
+    template2 = pitch_template(
+        'VerticalPitch',
+        # axis=True,
+        # label=True,
+        # tick=True,
+        goal_type='box',
+        line_color=pitch_line_color,
+        # line_alpha=0.5,
+        linewidth=pitch_line_width * 2,
 
-            grid_width=0.5,  # gris takes up 95% of the figure width
+        # bring the left axis in 10 data units (reduce the size)
+        pad_left=pitch_left_pad,
+        # bring the right axis in 10 data units (reduce the size)
+        pad_right=pitch_right_pad,
+        # extend the top axis 10 data units
+        pad_top=pitch_top_ad,
+        # extend the bottom axis 20 data units
+        pad_bottom=-8,
+    )
+    pitch2 = template2.pitch
 
-            # 1% of fig height is space between pitch and title
-            title_space=0.035,
+    # Pitch markings come from the cached background
+    fig2, axs2 = pitch_grid(
+        template2,
+        nrows=1, ncols=len(players),
+        figheight=10,
 
-            # 1% of fig height is space between pitch and endnote
-            endnote_space=0.01,
+        title_height=0.15,  # the title takes up 15% of the fig height
+        grid_height=0.7,  # the grid takes up 71.5% of the figure height
+        endnote_height=0.03,  # endnote takes up 6.5% of the figure height
 
-            space=0.1,  # 5% of grid_height is reserved for space between axes
+        grid_width=0.5,  # gris takes up 95% of the figure width
 
-            # centers the grid horizontally / vertically
-            left=0,
-            bottom=None,
-            axis=False,
-        )
+        # 1% of fig height is space between pitch and title
+        title_space=0.035,
 
-        # Figure background color
-        fig2.patch.set_facecolor(fig_bg_color)
+        # 1% of fig height is space between pitch and endnote
+        endnote_space=0.01,
 
-        # Add invisible text to add margins
-        axs2['pitch'][0].text(
-            x=-margin,
-            y=50,
-            s='o',
-            c=fig_bg_color,
-        )
-        axs2['pitch'][len(players)-1].text(
-            x=80+margin,
-            y=50,
-            s='o',
-            c=fig_bg_color,
-        )
-        # Add title
-        axs2['title'].text(
-            x=title_x2,
-            y=title_y2,
-            s=title_text2,
-            size=title_size2,
-            ha=title_ha2,
-            va=title_va2,
-            # weight='bold',
-        )
+        space=0.1,  # 5% of grid_height is reserved for space between axes
 
-        # Add subtitle 1
-        axs2['title'].text(
-            x=subtitle1_x2,
-            y=subtitle1_y2,
-            s=subtitle1_text2,
-            size=subtitle_size2,
-            ha=subtitle1_ha2,
-            va=subtitle1_va2,
-            # fontproperties=font_bold.prop,
-            color=subtitle1_color,
-            alpha=0.6,
-        )
+        # centers the grid horizontally / vertically
+        left=0,
+        bottom=None,
+        axis=False,
+    )
+
+    # Figure background color
+    fig2.patch.set_facecolor(fig_bg_color)
 
-        # Add team logo
-        image = Image.open(urlopen(image_url))
-        newax = fig2.add_axes([0, 0.855, 0.111, 0.111], anchor='W', zorder=1)
-        newax.imshow(image)
+    # Add invisible text to add margins
+    axs2['pitch'][0].text(
+        x=-margin,
+        y=50,
+        s='o',
+        c=fig_bg_color,
+    )
+    axs2['pitch'][len(players)-1].text(
+        x=80+margin,
+        y=50,
+        s='o',
+        c=fig_bg_color,
+    )
+    # Add title
+    axs2['title'].text(
+        x=title_x2,
+        y=title_y2,
+        s=title_text2,
+        size=title_size2,
+        ha=title_ha2,
+        va=title_va2,
+        # weight='bold',
+    )
+
+    # Add subtitle 1
+    axs2['title'].text(
+        x=subtitle1_x2,
+        y=subtitle1_y2,
+        s=subtitle1_text2,
+        size=subtitle_size2,
+        ha=subtitle1_ha2,
+        va=subtitle1_va2,
+        # fontproperties=font_bold.prop,
+        color=subtitle1_color,
+        alpha=0.6,
+    )
+
+    # Add team logo, from the local crest store
+    crest = team_crest(team)
+    if crest is not None:
+        newax = fig2.add_axes([0, 0.855, 0.111, 0.111], anchor='W',
+                              zorder=1)
+        newax.imshow(crest)
         newax.axis('off')
 
-        for i, ax in enumerate(axs2['pitch'].flat[:len(players)]):
-            # Player names
-            player_names = axs2['pitch'][i].text(
-                40, 126, players[i],
-                ha='center',
-                # va='center',
-                # weight='bold',
-                alpha=0.7,
-                fontsize=player_names_size,
-            )
+    for i, ax in enumerate(axs2['pitch'].flat[:len(players)]):
+        # Player names
+        player_names = axs2['pitch'][i].text(
+            40, 126, players[i],
+            ha='center',
+            # va='center',
+            # weight='bold',
+            alpha=0.7,
+            fontsize=player_names_size,
+        )
 
-            # Data 1
-            data_label = axs2['pitch'][i].text(
-                40, 121.5,
-                f'{player_events[players[i]]} Passes'
-                f' - {player_cmp[players[i]]}% Accuracy',
-                ha='center',
-                alpha=0.7,
-                # va='center',
-                fontsize=data1_size,
-            )
+        # Data 1
+        data_label = axs2['pitch'][i].text(
+            40, 121.5,
+            f'{player_events[players[i]]} Passes'
+            f' - {player_cmp[players[i]]}% Accuracy',
+            ha='center',
+            alpha=0.7,
+            # va='center',
+            fontsize=data1_size,
+        )
 
-            # ------------ Add 3rds Lines
-            y, _ = standard.transform([1/3 * 100, 2/3 * 100], [0, 0])
-
-            pitch_thirds2 = axs2['pitch'][i].hlines(
-                y=y,
-                xmin=-1,
-                xmax=81,
-                colors='black',
-                linestyles='dashed',
-                alpha=0.4,
-                clip_on=False,
-            )
+        # ------------ Add 3rds Lines
+        y, _ = OPTA_TO_STATSBOMB.transform([1/3 * 100, 2/3 * 100], [0, 0])
 
-            # Pitch background color
-            axs2['pitch'][i].set_facecolor(pitch_bg_color)
+        pitch_thirds2 = axs2['pitch'][i].hlines(
+            y=y,
+            xmin=-1,
+            xmax=81,
+            colors='black',
+            linestyles='dashed',
+            alpha=0.4,
+            clip_on=False,
+        )
+
+        # Pitch background color
+        axs2['pitch'][i].set_facecolor(pitch_bg_color)
 
+        player_df = team_df[team_df['player'] == players[i]]
+        if use_flow(player_df):
+            draw_pass_flow(pitch2, axs2['pitch'][i], player_df)
+        else:
             # Unsuccessful Passes
-            pdf = team_df[team_df['player'] == players[i]]
+            pdf = player_df
             pdf = pdf[pdf['outcome_type'] == 'Unsuccessful']
-            xstart, ystart = standard.transform(pdf['x'], pdf['y'])
-            xend, yend = standard.transform(pdf['end_x'], pdf['end_y'])
+            xstart, ystart = pdf['sb_x'], pdf['sb_y']
+            xend, yend = pdf['sb_end_x'], pdf['sb_end_y']
 
-            pitch.lines(
+            pitch2.lines(
                 xstart=xstart,
                 ystart=ystart,
                 xend=xend,
@@ -839,7 +1011,7 @@ with tab_two:
                 alpha_end=line_alpha_end2,
             )
 
-            pitch.scatter(
+            pitch2.scatter(
                 x=xend,
                 y=yend,
                 ax=axs2['pitch'][i],
@@ -850,12 +1022,12 @@ with tab_two:
             )
 
             # Successful Passes
-            pdf = team_df[team_df['player'] == players[i]]
+            pdf = player_df
             pdf = pdf[pdf['outcome_type'] == 'Successful']
-            xstart, ystart = standard.transform(pdf['x'], pdf['y'])
-            xend, yend = standard.transform(pdf['end_x'], pdf['end_y'])
+            xstart, ystart = pdf['sb_x'], pdf['sb_y']
+            xend, yend = pdf['sb_end_x'], pdf['sb_end_y']
 
-            pitch.lines(
+            pitch2.lines(
                 xstart=xstart,
                 ystart=ystart,
                 xend=xend,
@@ -870,7 +1042,7 @@ with tab_two:
                 alpha_end=line_alpha_end2,
             )
 
-            pitch.scatter(
+            pitch2.scatter(
                 x=xend,
                 y=yend,
                 ax=axs2['pitch'][i],
@@ -881,256 +1053,247 @@ with tab_two:
                 zorder=2,
             )
 
-            # ------------ Add Legend
-            # Trick to return handles and labels and show them in reversed order
-            handles, labels = axs2['pitch'][i].get_legend_handles_labels()
-            order = [1, 0]
-            # legend = axs2['pitch'][i].legend(
-            #     [handles[idx] for idx in order],
-            #     [labels[idx] for idx in order],
-            #     facecolor=legend_bg_color2,
-            #     # reverse=True,
-            #     # handlelength=5,
-            #     edgecolor=legend_edge_color2,
-            #     # prop=robotto_regular.prop,
-            #     labelcolor=legend_text_color2,
-            #     framealpha=legend_alpha2,
-            #     loc=legend_ref2,
-            #     bbox_to_anchor=legend_loc2,
-            #     fontsize='large',
-            # )
-
-            legend_y = 32
-            legend_completedt2 = axs2['pitch'][i].text(
-                x=40,
-                y=legend_y,
-                s=label_completed2(scc_player, players, i),
-                ha='center',
-                size=15,
-                color=event1_marker_color2,
-            )
-
-            legend_missed2 = axs2['pitch'][i].text(
-                x=40,
-                y=legend_y - 4.5,
-                s=label_missed2(player_events, scc_player, players, i),
-                ha='center',
-                size=15,
-                color=event2_marker_color2,
-            )
+        # ------------ Add Legend
+        # Trick to return handles and labels and show them in reversed order
+        handles, labels = axs2['pitch'][i].get_legend_handles_labels()
+        order = [1, 0]
+        # legend = axs2['pitch'][i].legend(
+        #     [handles[idx] for idx in order],
+        #     [labels[idx] for idx in order],
+        #     facecolor=legend_bg_color2,
+        #     # reverse=True,
+        #     # handlelength=5,
+        #     edgecolor=legend_edge_color2,
+        #     # prop=robotto_regular.prop,
+        #     labelcolor=legend_text_color2,
+        #     framealpha=legend_alpha2,
+        #     loc=legend_ref2,
+        #     bbox_to_anchor=legend_loc2,
+        #     fontsize='large',
+        # )
 
-        # ------------ Add Credits
-        # Twitter Account
-        tw_account = axs2['title'].text(
-            1,
-            .95,
-            '@DGCFutbol',
-            va='top',
-            ha='right',
-            fontsize=15.5,
-            weight='bold',
-            # ontproperties=robotto_regular.prop,
-            # color='#941C2F',
-            color=event1_marker_color1,
-            alpha=1,
+        legend_y = 32
+        legend_completedt2 = axs2['pitch'][i].text(
+            x=40,
+            y=legend_y,
+            s=label_completed2(scc_player, players, i),
+            ha='center',
+            size=15,
+            color=event1_marker_color2,
         )
 
-        # Source label
-        source = axs2['title'].text(
-            1,
-            .75,
-            'Source: \'Opta Sports\'',
-            va='top',
-            ha='right',
-            fontsize=13,
-            # weight='bold',
-            # ontproperties=robotto_regular.prop,
-            color='#030303',
-            # color=event1_marker_color1,
-            alpha=0.7,
+        legend_missed2 = axs2['pitch'][i].text(
+            x=40,
+            y=legend_y - 4.5,
+            s=label_missed2(player_events, scc_player, players, i),
+            ha='center',
+            size=15,
+            color=event2_marker_color2,
         )
 
-        st.pyplot(fig2,
-                  # use_container_width=False
-                  )
-
-with tab_four:
-
-    st.caption('Note: This viz only uses the \'Team\' filter.')
-
-    fig, axs = plt.subplots(nrows=4, ncols=5, figsize=(20, 18), dpi=200)
-    axs = np.array(axs)
-
-    for index, ax in enumerate(axs.reshape(-1)):
-        pitch = plot_attacking(ax)
-
-    plt.subplots_adjust(
-        left=0.05,
-        right=0.95,
-        bottom=0,
-        wspace=.1,
-        hspace=-0.5,
+    # ------------ Add Credits
+    # Twitter Account
+    tw_account = axs2['title'].text(
+        1,
+        .95,
+        '@DGCFutbol',
+        va='top',
+        ha='right',
+        fontsize=15.5,
+        weight='bold',
+        # ontproperties=robotto_regular.prop,
+        # color='#941C2F',
+        color=event1_marker_color1,
+        alpha=1,
     )
 
-    # Title axes stretches fig to full width
-    # dimensions(left, bottom, width, height) of new axes.
-    # In fractions of fig w and h
-    title_ax = fig.add_axes(
-        [0, 0.8, 1, 0.1]
+    # Source label
+    source = axs2['title'].text(
+        1,
+        .75,
+        'Source: \'Opta Sports\'',
+        va='top',
+        ha='right',
+        fontsize=13,
+        # weight='bold',
+        # ontproperties=robotto_regular.prop,
+        color='#030303',
+        # color=event1_marker_color1,
+        alpha=0.7,
     )
 
-    title_ax.axis('off')
+    return fig2
 
-    # Bottom-margin
-    fig.text(
-        x=0.5, y=0.09,
-        s='o',
-        c=fig_bg_color,
-    )
 
-    title = title_ax.text(
-        x=0.5, y=0.8,
-        s="WHICH TEAMS ARE GETTING BETTER AT PROGRESSING THE BALL?",
-        va="top", ha="center",
-        fontsize=25,
-        color="black",
-        # font="DM Sans",
-        weight="bold"
-    )
+# --------------------------- HEATMAP PARAMETERS ------------------------------
+heatmap_cmap = LinearSegmentedColormap.from_list(
+    'chalkboard', [pitch_bg_color, event1_marker_color1])
+heatmap_label_size = 12
 
-    # --------------------------- Filter Data
-    # --- General filter for all 5 columns
-
-    # Filter by team
-    pdf = df[df['team'] == team]
-
-    # Filter by Opposition
-    pdf = pdf[
-        ((pdf['home'] == team) & (pdf['away'].isin(rivals)))
-        |
-        ((pdf['home'].isin(rivals)) & (pdf['away'] == team))
-        ]
 
-    # Passes only
-    pdf = pdf[pdf['type'] == 'Pass']
-
-    # --- First Column - Passes into Final 3rd
-    pdf1 = pdf[
-        (pdf['end_x'] >= (2/3 * 100))
-        & (pdf['end_x'] <= (3/3 * 100))
-        ]
+def draw_heatmap(binned, players, bin_type, point, statistic):
+    """ Events of `players` (the whole team when empty) per bin, as counts
+    or success rates, from the precomputed `binned` tables. """
+    counts, successes = binned.stats(point.lower(), bin_type, players or None)
+    if statistic == 'Events':
+        values = counts.astype(float)
+        vmin, vmax, str_format = 0, max(counts.max(), 1), '{:.0f}'
+    else:
+        values = np.full(len(counts), np.nan)
+        np.divide(successes * 100, counts, out=values, where=counts > 0)
+        vmin, vmax, str_format = 0, 100, '{:.0f}%'
 
-    # --- Second Column - Carries into Final 3rd
-    # --- Third Column - Passes into Pen Box
+    template = pitch_template(
+        'Pitch',
+        goal_type='box',
+        line_color=pitch_line_color,
+        linewidth=pitch_line_width,
+        pitch_color=pitch_bg_color,
+        # markings over the bins
+        line_zorder=2,
+    )
+    pitch = template.pitch
 
-    # Filter by penalty box coordinates
-    sb_to_op = Standardizer(pitch_from='statsbomb', pitch_to='opta')
-    endx, endy = sb_to_op.transform([102, 102], [18, 62])
-    pdf3 = pdf[
-        (
-                (pdf['end_x'] >= endx[0])
-                & (pdf['end_y'] >= endy[1])
-                & (pdf['end_y'] <= endy[0])
+    # Axes are placed before the pitch background is sized to them
+    fig = Figure(figsize=(12, 9.5))
+    fig.patch.set_facecolor(fig_bg_color)
+    ax = fig.add_axes([0.04, 0.12, 0.92, 0.7])
+    cax = fig.add_axes([0.3, 0.07, 0.4, 0.02])
+    draw_pitch(ax, template, dpi=screen_dpi)
+
+    if bin_type == 'Hexbin':
+        # One centre per hexagon with events, carrying its value
+        cx, cy = hex_centres()
+        shown = counts > 0
+        mappable = pitch.hexbin(
+            cx[shown], cy[shown], C=values[shown], reduce_C_function=np.sum,
+            gridsize=HEX_GRIDSIZE, extent=HEX_EXTENT, mincnt=0,
+            cmap=heatmap_cmap, vmin=vmin, vmax=vmax,
+            edgecolors=pitch_bg_color, ax=ax,
         )
-        ]
-
-
-    # --- Fourth Column - Carries into Pen Box
-
-    # --- Fifth Column - Passes in Pen Box
-
-    # --------------------------- Plot Events
+    else:
+        stats = rect_stats(values, bin_type)
+        mappable = pitch.heatmap(stats, ax=ax, cmap=heatmap_cmap,
+                                 vmin=vmin, vmax=vmax,
+                                 edgecolors=pitch_bg_color)
+        pitch.label_heatmap(stats, ax=ax, str_format=str_format,
+                            exclude_zeros=statistic == 'Events',
+                            exclude_nan=True,
+                            fontsize=heatmap_label_size,
+                            color=pitch_line_color,
+                            ha='center', va='center')
+
+    fig.colorbar(mappable, cax=cax, orientation='horizontal')
+    cax.set_xlabel(f'{statistic} per zone')
+
+    # ------------ Title
+    who = ', '.join(players) if players else team
+    fig.text(0.5, 0.93, f'{who} | {event} {point.lower()} locations',
+             ha='center', va='top', fontsize=title_size2, weight='bold')
+    fig.text(0.5, 0.865, f'{subtitle1_text} | {bin_type}',
+             ha='center', va='top', fontsize=subtitle_size2)
+
+    # ------------ Add Credits
+    fig.text(0.96, 0.03, '@DGCFutbol', ha='right', va='bottom',
+             fontsize=13, weight='bold', color='#030303', alpha=0.3)
+
+    return fig
 
-    # --- Third Column - Passes into Pen Box
-    lw = 1
-    mw1 = 1
 
-    # Get top 5 players with most  successful passes
-    pdf_f = pdf3[pdf3['outcome_type'] == 'Successful']
-    top = pdf_f[['player', 'type']].groupby(['player']).agg('count')
-    print(top)
-    top = top.sort_values(by=['type'], ascending=False).head().index.to_list()
+# ----------------------------- SETUP FIGURE
 
-    for i, player in enumerate(top):
+# Only the chosen viz is built. Rendered images are cached by the filters
+# they depend on, so switching back to a viz is a cache hit.
+view = st.radio(
+    label='Choose viz',
+    options=[
+        "One Player",
+        "Three Players",
+        "Inside Final 3rd",
+        "Team Attack Contribution",
+        "Heatmap",
+    ],
+    horizontal=True,
+    label_visibility='collapsed',
+)
+chalkboard_images = image_cache('chalkboard')
+attack_export = None
 
-        # Filter by player
-        pdf = pdf3[pdf3['player'] == player]
-        # Unsuccessful Passes
-        pdfu = pdf[pdf['outcome_type'] == 'Unsuccessful']
-        xstart, ystart = standard.transform(pdfu['x'], pdfu['y'])
-        xend, yend = standard.transform(pdfu['end_x'], pdfu['end_y'])
+if view == 'One Player':
+    if len(players) == 0:
+        st.caption('This viz requires at least 1 player selected.')
+    else:
+        fig_png = chalkboard_images.get_or_render(
+            (view, filter_key, events.matchweek, tuple(players), title_text,
+             exact_render),
+            lambda: figure_to_png(draw_one_player(plot_df)),
+        )
+        st.image(fig_png, use_column_width=True)
 
-        axs[2][i].text(
-            x=60, y=-5,
-            s=f'{player}',
-            ha='center',
-            va='bottom'
+# -------------------------- SETUP MULTIGRID FIGURE
+elif view == 'Three Players':
+    if len(players) != 3:
+        st.caption('This viz requires only 3 players selected.')
+    else:
+        fig_png = chalkboard_images.get_or_render(
+            (view, filter_key, events.matchweek, tuple(players), title_text2,
+             exact_render),
+            lambda: figure_to_png(draw_three_players(team_df)),
         )
+        st.image(fig_png, use_column_width=True)
 
-        pitch.lines(
-            xstart=xstart,
-            ystart=ystart,
-            xend=xend,
-            yend=yend,
-            comet=is_line_transparent,
-            # color='#c1c1bf', # BenGriffis gray
-            color=event2_marker_color1,
-            ax=axs[2][i],
-            lw=lw,
-            label=f'55'
-                  f' missed',
+        if team_crest(team) is None:
+            st.caption('No team crest found in assets/crests, run '
+                       '`python fetch_crests.py` to download them.')
 
-            transparent=is_line_transparent,
-            alpha_start=line_alpha_start2,
-            alpha_end=line_alpha_end2,
-        )
+elif view == 'Team Attack Contribution':
 
-        pitch.scatter(
-            x=xend,
-            y=yend,
-            ax=axs[2][i],
-            s=mw1,
-            # linewidth=0,
-            marker='o',
-            facecolor=event2_marker_color1,
-        )
+    st.caption('Note: This viz only uses the \'Team\' filter.')
 
-        # Successful Passes
-        pdfs = pdf[pdf['outcome_type'] == 'Successful']
-        xstart, ystart = standard.transform(pdfs['x'], pdfs['y'])
-        xend, yend = standard.transform(pdfs['end_x'], pdfs['end_y'])
+    # Filter by team and opposition, passes only
+    attack_df = events.select(team, rivals, 'Pass')
+    if event == 'Pass':
+        attack_df = attack_df[(attack_df['length'] >= l1)
+                              & (attack_df['length'] <= l2)]
 
-        pitch.lines(
-            xstart=xstart,
-            ystart=ystart,
-            xend=xend,
-            yend=yend,
-            comet=True,
-            color=event1_marker_color1,
-            ax=axs[2][i],
-            lw=lw,
-            label=f'50',
-            transparent=is_line_transparent,
-            alpha_start=line_alpha_start2,
-            alpha_end=line_alpha_end2,
-        )
+    attack_template = attacking_template()
 
-        pitch.scatter(
-            x=xend,
-            y=yend,
-            ax=axs[2][i],
-            s=mw1,
-            marker='o',
-            facecolor=event1_marker_color2,
-            # facecolor='#ef4146',
-            zorder=2,
-        )
+    # Screen resolution only, print resolution is left to the export
+    fig_png = chalkboard_images.get_or_render(
+        (view, filter_key),
+        lambda: figure_to_png(draw_team_attack(attack_df, attack_template),
+                              dpi=screen_dpi),
+    )
+    st.image(fig_png, use_column_width=True)
+
+    attack_export = export_controls(
+        'team_attack',
+        draw_team_attack,
+        (attack_df, attack_template, True),
+        file_name=f'{team} Attack Contribution',
+        filters=filter_key,
+    )
 
-    plt.savefig('filename.png',
-                bbox_inches='tight',
-                dpi=500
-                )
+elif view == 'Heatmap':
+    col1, col2, col3 = st.columns(3)
+    bin_type = col1.selectbox('Bins', BIN_TYPES)
+    point = col2.selectbox('Location', ['Start', 'End'])
+    statistic = col3.selectbox('Show', ['Events', 'Success %'])
+
+    if len(players) == 0:
+        st.caption('No player selected, showing the whole team.')
+
+    # Bins of every team player are counted once per filter selection,
+    # changing players only sums their rows
+    binned = binned_events(team_df)
+    fig_png = chalkboard_images.get_or_render(
+        (view, filter_key, events.matchweek, tuple(players), bin_type, point,
+         statistic),
+        lambda: figure_to_png(
+            draw_heatmap(binned, players, bin_type, point, statistic),
+            dpi=screen_dpi),
+    )
+    st.image(fig_png, use_column_width=True)
 
-    st.pyplot(fig,
-              # use_container_width=False
-              )
+# Exports render in the background while the page draws, collect them last
+show_download(attack_export)
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from metrics import season_metrics, stat_columns
+from stats_store import load_season
+
+# Players with fewer 90s than this are left out of the ranks
+MIN_90S = 5
+
+POSITION_NAMES = {
+    'GK': 'Goalkeepers',
+    'DF': 'Defenders',
+    'MF': 'Midfielders',
+    'FW': 'Forwards',
+}
+
+
+def rank_stats(df, min_90s=MIN_90S):
+    """ Percentile rank (0-100) of every stat in one vectorized pass. `df`
+    holds p90/PAdj values (`metrics.derived_metrics`). Zeros on a stat and
+    players under `min_90s` are not ranked (NaN). """
+    stats = stat_columns(df)
+    vals = df[stats]
+
+    # Eliminate zeros and players with less than `min_90s`
+    eligible = (vals != 0) & (df['90s'] >= min_90s).to_numpy()[:, None]
+    ranks = (vals.where(eligible).rank(pct=True) * 100).round(2)
+
+    return pd.concat([df[['player', 'team', '90s']], ranks], axis=1)
+
+
+def position_cohorts(df):
+    """ Cohort name -> row mask. 'All' players, every position (players
+    listing it anywhere in `pos`) and every multi-position string such as
+    'MF,FW' (exact match). """
+    pos = df['pos'].fillna('')
+    listed = pos.str.get_dummies(sep=',').astype(bool)
+
+    cohorts = {'All': np.ones(len(df), dtype=bool)}
+    for p in POSITION_NAMES:
+        if p in listed:
+            cohorts[p] = listed[p].to_numpy()
+    for p in sorted(pos[pos.str.contains(',')].unique()):
+        cohorts[p] = (pos == p).to_numpy()
+
+    return cohorts
+
+
+def cohort_label(cohort):
+    """ Plural name of a cohort, e.g. 'MF,FW' -> 'Midfielders/Forwards'. """
+    if cohort == 'All':
+        return 'Players'
+
+    return '/'.join(POSITION_NAMES.get(p, p) for p in cohort.split(','))
+
+
+@st.cache_resource
+def cohort_ranks(league, season, exclude_vals, min_90s=MIN_90S):
+    """ Percentile ranks of every position cohort of a league and season
+    (`stats_store.load_season`), computed once so switching cohorts is a
+    dict lookup. """
+    df = load_season(league, season)
+    # PAdj needs the possession of the whole table, not of a cohort
+    metrics = season_metrics(league, season, exclude_vals)
+
+    return {cohort: rank_stats(metrics[mask], min_90s)
+            for cohort, mask in position_cohorts(df).items()}
+
+
+def percentile_ranks(league, season, exclude_vals, min_90s=MIN_90S,
+                     cohort='All'):
+    """ Ranks of a league and season with players ranked only against
+    `cohort`. """
+    return cohort_ranks(league, season, exclude_vals, min_90s)[cohort]
+
+
+def player_ranks(ranks, player, team, stats):
+    """ Ranks of one player on `stats`, 0 where the player is unranked. """
+    row = ranks[(ranks['player'] == player) & (ranks['team'] == team)]
+    if row.empty:
+        return [0] * len(stats)
+
+    return row[stats].iloc[0].fillna(0).tolist()
@@ -0,0 +1,112 @@
+import copy
+import functools
+import threading
+
+import numpy as np
+import streamlit as st
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from mplsoccer import Pitch, VerticalPitch, set_visible
+
+# Blank border (inches) around the rendered pitch, so markings on the edge
+# of the axes keep the part that overhangs it
+RASTER_MARGIN = 0.1
+
+PITCH_TYPES = {
+    'Pitch': Pitch,
+    'VerticalPitch': VerticalPitch,
+}
+
+
+class PitchTemplate:
+    """ A pitch whose markings are rendered once per axes size and dpi to a
+    transparent RGBA raster, so figures only draw their events on top. """
+
+    def __init__(self, pitch):
+        self.pitch = pitch
+        self._rasters = {}
+        self._lock = threading.Lock()
+
+    def raster(self, width_in, dpi):
+        key = (width_in, dpi)
+        with self._lock:
+            if key not in self._rasters:
+                self._rasters[key] = self._render(*key)
+
+            return self._rasters[key]
+
+    def extent(self, width_in):
+        """ Data extent of the raster for an axes `width_in` wide,
+        including the margin. """
+        left, right, bottom, top = self.pitch.extent
+        height_in = width_in / self.pitch.ax_aspect
+        dx = (right - left) / width_in * RASTER_MARGIN
+        dy = (top - bottom) / height_in * RASTER_MARGIN
+
+        return left - dx, right + dx, bottom - dy, top + dy
+
+    def _render(self, width_in, dpi):
+        # Size the figure to the pitch axes plus the margin
+        height_in = width_in / self.pitch.ax_aspect
+        fig_w = width_in + 2 * RASTER_MARGIN
+        fig_h = height_in + 2 * RASTER_MARGIN
+        fig = Figure(figsize=(fig_w, fig_h), dpi=dpi)
+        canvas = FigureCanvasAgg(fig)
+        fig.patch.set_alpha(0)
+
+        ax = fig.add_axes([RASTER_MARGIN / fig_w, RASTER_MARGIN / fig_h,
+                           width_in / fig_w, height_in / fig_h])
+        self.pitch.draw(ax=ax)
+        # Markings only, the background colour is set on each axes
+        ax.patch.set_visible(False)
+
+        canvas.draw()
+
+        return np.asarray(canvas.buffer_rgba()).copy()
+
+
+@st.cache_resource
+def pitch_template(kind, **pitch_kwargs):
+    """ Shared template of a `kind` pitch ('Pitch' or 'VerticalPitch') built
+    with `pitch_kwargs`. """
+    return PitchTemplate(PITCH_TYPES[kind](**pitch_kwargs))
+
+
+def draw_pitch(ax, template, dpi=200):
+    """ Stand-in for `pitch.draw(ax=ax)`: same limits, aspect and background,
+    with the markings from the cached raster instead of new artists. `dpi`
+    is the resolution the figure will be saved at. """
+    pitch = template.pitch
+    left, right, bottom, top = pitch.extent
+
+    set_visible(ax, spine_bottom=pitch.axis, spine_top=pitch.axis,
+                spine_left=pitch.axis, spine_right=pitch.axis, grid=False,
+                tick=pitch.tick, label=pitch.label)
+    ax.set_facecolor(pitch.pitch_color)
+    ax.set_xlim(left, right)
+    ax.set_ylim(bottom, top)
+    ax.set_aspect(pitch.dim.aspect)
+
+    # Render the markings at the size the axes ends up on the figure
+    ax.apply_aspect()
+    width_in = round(ax.get_position().width * ax.figure.get_figwidth(), 2)
+
+    ax.imshow(template.raster(width_in, dpi),
+              extent=template.extent(width_in),
+              origin='upper',
+              aspect=pitch.dim.aspect,
+              zorder=pitch.line_zorder,
+              clip_on=False)
+
+    # imshow can move the limits
+    ax.set_xlim(left, right)
+    ax.set_ylim(bottom, top)
+
+
+def pitch_grid(template, dpi=200, **grid_kwargs):
+    """ `pitch.grid(**grid_kwargs)` with every pitch drawn by `draw_pitch`. """
+    pitch = copy.copy(template.pitch)
+    # Pitch.grid draws each axes through self.draw(ax=ax)
+    pitch.draw = functools.partial(draw_pitch, template=template, dpi=dpi)
+
+    return pitch.grid(**grid_kwargs)
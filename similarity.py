@@ -0,0 +1,105 @@
+import functools
+import operator
+
+import numpy as np
+import pandas as pd
+import pyarrow.dataset as ds
+import streamlit as st
+
+from metrics import EXCLUDE_P90, PADJ_PREFIX, padj_values, per90_values
+from percentiles import MIN_90S
+from stats_store import stat_warehouse
+
+# Columns shown for each neighbour
+INFO_COLUMNS = ['league', 'season', 'team', 'player', 'pos', '90s']
+
+
+class SimilarityIndex:
+    """ Every player-season as a unit vector of standardized p90 stats, so
+    the cosine similarity of one player to the whole pool is a single
+    matrix-vector product. Only players with `min_90s` are standardized on
+    and returned as neighbours, but anyone can be queried. """
+
+    def __init__(self, df, stats, min_90s=MIN_90S):
+        self.stats = list(stats)
+        self.players = df[INFO_COLUMNS].reset_index(drop=True)
+        self.eligible = (df['90s'] >= min_90s).to_numpy()
+
+        values = df[self.stats].to_numpy(dtype=np.float64)
+        values[~np.isfinite(values)] = np.nan
+        mean = np.nanmean(values[self.eligible], axis=0)
+        std = np.nanstd(values[self.eligible], axis=0)
+
+        # Missing values and constant stats count as average
+        with np.errstate(divide='ignore', invalid='ignore'):
+            z = np.nan_to_num((values - mean) / std, nan=0, posinf=0,
+                              neginf=0)
+
+        norms = np.linalg.norm(z, axis=1, keepdims=True)
+        self.vectors = (z / np.where(norms > 0, norms, 1)).astype(np.float32)
+
+        keys = self.players[['league', 'season', 'team', 'player']]
+        self._rows = {key: i for i, key in
+                      enumerate(keys.itertuples(index=False, name=None))}
+
+    def row(self, league, season, team, player):
+        """ Position of a player-season in the index, None if not in it. """
+        return self._rows.get((league, season, team, player))
+
+    def neighbours(self, row, k=10):
+        """ The `k` players most similar to the player at `row`, most similar
+        first, with their cosine similarity (-100 to 100). """
+        scores = self.vectors @ self.vectors[row]
+        scores[~self.eligible] = -np.inf
+        scores[row] = -np.inf
+
+        k = min(k, int(np.isfinite(scores).sum()))
+        top = np.argpartition(scores, -k)[-k:] if k \
+            else np.zeros(0, dtype=np.intp)
+        top = top[np.argsort(scores[top])[::-1]]
+
+        return self.players.iloc[top].assign(
+            similarity=(scores[top].astype(np.float64) * 100).round(1))
+
+
+def base_stat(stat):
+    """ Warehouse column a stat is derived from, e.g. 'PAdj Tkl' -> 'Tkl'. """
+    return stat[len(PADJ_PREFIX):] if stat.startswith(PADJ_PREFIX) else stat
+
+
+def pool_filter(pool):
+    """ Warehouse filter for the (league, season) partitions of `pool`. """
+    return functools.reduce(operator.or_, (
+        (ds.field('league') == league) & (ds.field('season') == season)
+        for league, season in pool))
+
+
+def pool_values(df, stats, exclude_vals=EXCLUDE_P90):
+    """ `stats` of a multi-season frame (INFO_COLUMNS, PassesAttempted and
+    the columns `stats` derive from), per 90 and PAdj as in
+    `metrics.derived_metrics`. Possession is taken within each league and
+    season. """
+    base = list(dict.fromkeys(map(base_stat, stats)))
+    p90 = per90_values(df, base, exclude_vals)
+
+    # One PAdj frame per season, stacked so each stat stays one column
+    padj = pd.concat([padj_values(season, p90.loc[season.index])
+                      for _, season in df.groupby(['league', 'season'])])
+
+    return pd.concat([p90, padj], axis=1)[list(stats)]
+
+
+@st.cache_resource(max_entries=16)
+def similarity_index(pool, stats, exclude_vals=EXCLUDE_P90):
+    """ `SimilarityIndex` on `stats` over every (league, season) of `pool`,
+    built once per pool and stat set. Only the info columns and the columns
+    `stats` are derived from are read, and only those are taken per 90. """
+    # PAdj needs the possession of each team, from its passes attempted
+    columns = list(dict.fromkeys(INFO_COLUMNS + ['PassesAttempted']
+                                 + list(map(base_stat, stats))))
+    df = stat_warehouse().to_table(columns=columns,
+                                   filter=pool_filter(pool)).to_pandas()
+    values = pool_values(df, stats, exclude_vals)
+
+    return SimilarityIndex(pd.concat([df[INFO_COLUMNS], values], axis=1),
+                           stats)
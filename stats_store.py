@@ -0,0 +1,158 @@
+import glob
+import os
+import shutil
+
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.dataset as ds
+import pyarrow.fs as pa_fs
+import streamlit as st
+
+# Stat CSVs (any mix of leagues and seasons, keyed by their `league` and
+# `season` columns) that feed the warehouse
+SOURCE_GLOB = 'data/*_fbref_stats.csv'
+
+# Arrow IPC warehouse partitioned as league=<league>/season=<season>/. Its
+# files are build artifacts, regenerated whenever their source CSV is newer.
+STORE_DIR = 'data/store'
+WAREHOUSE_DIR = os.path.join(STORE_DIR, 'stats')
+PARTITIONING = ds.partitioning(
+    pa.schema([('league', pa.string()), ('season', pa.int64())]),
+    flavor='hive',
+)
+
+
+def source_name(csv_path):
+    return os.path.splitext(os.path.basename(csv_path))[0]
+
+
+def warehouse_files(csv_path):
+    """ Partition files written from `csv_path`. """
+    pattern = os.path.join(WAREHOUSE_DIR, '*', '*',
+                           f'{source_name(csv_path)}-*.arrow')
+    return glob.glob(pattern)
+
+
+def build_partitions(csv_path):
+    """ Split a stats CSV into its league/season partitions as uncompressed
+    Arrow IPC files, so they can be memory-mapped. Skipped when they are
+    already newer than the CSV. """
+    files = warehouse_files(csv_path)
+    if files and min(map(os.path.getmtime, files)) \
+            >= os.path.getmtime(csv_path):
+        return
+
+    # Write to a temp folder first so other processes never map a
+    # half-written partition, then move each file into place
+    tmp_dir = os.path.join(STORE_DIR,
+                           f'.{source_name(csv_path)}.{os.getpid()}.tmp')
+    ds.write_dataset(
+        pa_csv.read_csv(csv_path),
+        tmp_dir,
+        format='ipc',
+        partitioning=PARTITIONING,
+        basename_template=f'{source_name(csv_path)}-{{i}}.arrow',
+        existing_data_behavior='delete_matching',
+    )
+
+    written = set()
+    for root, _, names in os.walk(tmp_dir):
+        for name in names:
+            rel_path = os.path.relpath(os.path.join(root, name), tmp_dir)
+            path = os.path.join(WAREHOUSE_DIR, rel_path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(os.path.join(root, name), path)
+            written.add(os.path.normpath(path))
+    shutil.rmtree(tmp_dir)
+
+    # Partitions the CSV no longer has
+    for path in files:
+        if os.path.normpath(path) not in written:
+            os.remove(path)
+
+
+@st.cache_resource
+def stat_warehouse():
+    """ Dataset over every league/season partition, built once per process.
+    Nothing is read until a partition is loaded. """
+    for csv_path in sorted(glob.glob(SOURCE_GLOB)):
+        build_partitions(csv_path)
+
+    return ds.dataset(WAREHOUSE_DIR,
+                      format='ipc',
+                      partitioning=PARTITIONING,
+                      filesystem=pa_fs.LocalFileSystem(use_mmap=True))
+
+
+def partitions():
+    """ (league, season) of every partition in the warehouse, sorted. """
+    keys = set()
+    for fragment in stat_warehouse().get_fragments():
+        key = ds.get_partition_keys(fragment.partition_expression)
+        keys.add((key['league'], key['season']))
+
+    return sorted(keys)
+
+
+@st.cache_resource
+def load_season(league, season):
+    """ Stats of one league and season as a DataFrame shared by every
+    session and page. The filter only opens that partition's files, and
+    numeric columns without nulls point straight into the memory-mapped
+    file (read-only), so never modify the returned frame in place. """
+    dataset = stat_warehouse()
+    table = dataset.to_table(filter=(ds.field('league') == league)
+                             & (ds.field('season') == season))
+
+    # Partition keys come back last, put them first as in the CSVs
+    first = ['league', 'season']
+    table = table.select(first + [c for c in table.column_names
+                                  if c not in first])
+
+    return table.to_pandas(split_blocks=True)
+
+
+def league_label(league):
+    """ 'ENG-Premier League' -> 'Premier League'. """
+    return league.split('-', 1)[-1]
+
+
+def season_label(season):
+    """ 2223 -> '22-23'. """
+    return f'{season // 100:02d}-{season % 100:02d}'
+
+
+def current_season():
+    """ League and season picked in the sidebar, with their stats from the
+    process-wide registry (`load_season`). Any page can call it, none relies
+    on another page having run first. """
+    league, season = select_partition()
+
+    return league, season, load_season(league, season)
+
+
+def select_partition():
+    """ League and season pickers in the sidebar. The choice is kept in the
+    session, so every stat page shows the same partition. """
+    keys = partitions()
+    current = st.session_state.get('partition', keys[-1])
+
+    leagues = sorted({league for league, _ in keys})
+    league = st.sidebar.selectbox(
+        label='League',
+        options=leagues,
+        index=leagues.index(current[0]) if current[0] in leagues else 0,
+        format_func=league_label,
+    )
+
+    seasons = sorted({s for lg, s in keys if lg == league}, reverse=True)
+    season = st.sidebar.selectbox(
+        label='Season',
+        options=seasons,
+        index=seasons.index(current[1]) if current[1] in seasons else 0,
+        format_func=season_label,
+    )
+
+    st.session_state['partition'] = (league, season)
+
+    return league, season
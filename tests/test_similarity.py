@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+
+from similarity import INFO_COLUMNS, SimilarityIndex, pool_values
+
+STATS = ('PAdj Tkl+Int', 'PAdj Clr', 'npxG')
+PARTITIONS = [('ENG-Premier League', 2223), ('ENG-Premier League', 2324),
+              ('ESP-La Liga', 2324)]
+
+
+def season_frame(seed=0, n_teams=4, per_team=5):
+    rng = np.random.default_rng(seed)
+    n = n_teams * per_team
+    return pd.DataFrame({
+        'team': np.repeat([f'Team {i}' for i in range(n_teams)], per_team),
+        'player': [f'Player {i}' for i in range(n)],
+        'pos': 'MF',
+        '90s': rng.uniform(5, 38, n).round(1),
+        'PassesAttempted': rng.integers(200, 2000, n),
+        'Tkl+Int': rng.integers(0, 120, n),
+        'Clr': rng.integers(0, 80, n),
+        'npxG': rng.uniform(0, 15, n),
+    })
+
+
+def pool_frame():
+    """ The same season copied into every partition. """
+    season = season_frame()
+    frames = [season.assign(league=league, season=year)
+              for league, year in PARTITIONS]
+    return pd.concat(frames, ignore_index=True)
+
+
+def test_one_column_per_stat_across_partitions():
+    df = pool_frame()
+    values = pool_values(df, STATS)
+    index = SimilarityIndex(pd.concat([df[INFO_COLUMNS], values], axis=1),
+                            STATS)
+
+    assert list(values.columns) == list(STATS)
+    assert not values.isna().any().any()
+    assert index.vectors.shape == (len(df), len(STATS))
+
+
+def test_copies_in_other_partitions_are_neighbours():
+    df = pool_frame()
+    values = pool_values(df, STATS)
+    index = SimilarityIndex(pd.concat([df[INFO_COLUMNS], values], axis=1),
+                            STATS)
+
+    row = index.row(*PARTITIONS[0], 'Team 0', 'Player 0')
+    top = index.neighbours(row, k=len(PARTITIONS) - 1)
+
+    assert set(top['player']) == {'Player 0'}
+    assert (top['similarity'] == 100).all()
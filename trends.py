@@ -0,0 +1,190 @@
+import numpy as np
+import pandas as pd
+import statsmodels.api as sm
+import streamlit as st
+
+from metrics import season_metrics, stat_columns
+from percentiles import MIN_90S
+
+TREND_TYPES = ['OLS', 'Robust', 'LOWESS']
+ZONE_TYPES = ['Median', 'Average']
+
+# Share of the points behind each LOWESS estimate
+LOWESS_FRAC = 2 / 3
+
+# Quantile bins per stat for mutual information
+MI_BINS = 8
+# Pairs this correlated are near-duplicates (e.g. a stat and its PAdj
+# version), not suggestions
+MAX_SUGGESTED_R = 0.9
+
+
+def fit_trend(x, y, trend_type='OLS'):
+    """ Trend line of y on x: line points sorted by x, the fit's parameters
+    (intercept, slope; None for LOWESS) and residuals. Points with a missing
+    or infinite value are left out. """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    keep = np.isfinite(x) & np.isfinite(y)
+    order = np.argsort(x[keep], kind='stable')
+    x, y = x[keep][order], y[keep][order]
+
+    if trend_type == 'LOWESS':
+        fitted = sm.nonparametric.lowess(y, x, frac=LOWESS_FRAC,
+                                         return_sorted=False)
+        params = None
+    else:
+        exog = sm.add_constant(x, has_constant='add')
+        if trend_type == 'Robust':
+            model = sm.RLM(y, exog, M=sm.robust.norms.HuberT())
+        else:
+            model = sm.OLS(y, exog)
+        results = model.fit()
+        fitted = results.fittedvalues
+        params = results.params
+
+    return {
+        'x': x,
+        'y': fitted,
+        'params': params,
+        'resid': y - fitted,
+    }
+
+
+def zone_lines(x, y, zone_type='Median'):
+    """ (vertical, horizontal) zone line at the median or average of x and
+    y. """
+    reduce = np.median if zone_type == 'Median' else np.average
+
+    return reduce(x), reduce(y)
+
+
+# Fits are cheaper than hashing the frame, so the trend caches are keyed by
+# what selects the points instead: the season, the x/y pair and the 90s
+# range. `_df` must be the season's metrics filtered to `z_range`
+
+
+@st.cache_resource(max_entries=256)
+def scatter_trend(_df, dataset, xv, yv, z_range, trend_type):
+    """ `fit_trend` of `yv` on `xv` for the players of `dataset` with 90s
+    within `z_range`. Cosmetic reruns reuse it. """
+    return fit_trend(_df[xv], _df[yv], trend_type)
+
+
+@st.cache_resource(max_entries=256)
+def scatter_zone_lines(_df, dataset, xv, yv, z_range, zone_type):
+    """ `zone_lines` of `xv` and `yv`, memoized like `scatter_trend`. """
+    return zone_lines(_df[xv], _df[yv], zone_type)
+
+
+def pairwise_corr(values):
+    """ Pearson r of every pair of columns of `values` (players x stats),
+    each pair over the players with both values, as pandas' corr does. """
+    present = np.isfinite(values)
+    x = np.where(present, values, 0)
+    present = present.astype(np.float64)
+
+    n = present.T @ present
+    sx = x.T @ present  # Sum of x over the players with y
+    sxx = (x * x).T @ present
+    sxy = x.T @ x
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cov = sxy - sx * sx.T / n
+        var_x = sxx - sx ** 2 / n
+        r = cov / np.sqrt(var_x * var_x.T)
+
+    return np.clip(r, -1, 1)
+
+
+def quantile_bins(values, n_bins=MI_BINS):
+    """ Quantile bin (0 to n_bins - 1) of each value, per column, -1 where
+    missing. Ties share a bin. """
+    ranks = pd.DataFrame(values).rank(pct=True).to_numpy()
+    bins = np.minimum(np.ceil(ranks * n_bins) - 1, n_bins - 1)
+
+    return np.where(np.isnan(ranks), -1, bins).astype(np.int64)
+
+
+def pairwise_mutual_info(values, n_bins=MI_BINS):
+    """ Mutual information (nats) of every pair of columns of `values` on
+    quantile bins, from one matrix product of the one-hot bin table. """
+    n_rows, n_stats = values.shape
+    bins = quantile_bins(values, n_bins)
+
+    one_hot = np.zeros((n_rows, n_stats, n_bins))
+    rows, cols = np.nonzero(bins >= 0)
+    one_hot[rows, cols, bins[rows, cols]] = 1
+    one_hot = one_hot.reshape(n_rows, n_stats * n_bins)
+
+    # Joint bin counts of every pair, over the players with both values
+    joint = (one_hot.T @ one_hot).reshape(n_stats, n_bins, n_stats, n_bins)
+    joint = joint.transpose(0, 2, 1, 3)
+    total = joint.sum(axis=(2, 3), keepdims=True)
+    p = joint / np.where(total > 0, total, 1)
+    p_x = p.sum(axis=3, keepdims=True)
+    p_y = p.sum(axis=2, keepdims=True)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        terms = np.where(p > 0, p * np.log(p / (p_x * p_y)), 0)
+
+    return terms.sum(axis=(2, 3))
+
+
+class StatCorrelations:
+    """ Correlation and mutual information of every pair of stats of a
+    season, for players with at least `min_90s`. Built once, then any x/y
+    lookup or pair suggestion is an array read. """
+
+    def __init__(self, df, min_90s=MIN_90S):
+        self.stats = stat_columns(df)
+        values = df.loc[df['90s'] >= min_90s, self.stats]
+        values = values.to_numpy(dtype=np.float64)
+
+        self.r = pairwise_corr(values)
+        self.mi = pairwise_mutual_info(values)
+        self._position = {stat: i for i, stat in enumerate(self.stats)}
+
+    def r2(self, xv, yv):
+        """ r² of two stats, NaN when either is unknown or constant. """
+        i, j = self._position.get(xv), self._position.get(yv)
+        if i is None or j is None:
+            return np.nan
+
+        return self.r[i, j] ** 2
+
+    def mutual_info(self, xv, yv):
+        i, j = self._position.get(xv), self._position.get(yv)
+        if i is None or j is None:
+            return np.nan
+
+        return self.mi[i, j]
+
+    def suggest_pairs(self, stat=None, k=10):
+        """ (x, y, r², mutual information) of the `k` most related pairs by
+        mutual information, only those with `stat` when given. Pairs that
+        are near-duplicates are skipped. """
+        mi = np.triu(self.mi, k=1)
+        mi[~(np.abs(self.r) < MAX_SUGGESTED_R)] = 0
+        if stat in self._position:
+            i = self._position[stat]
+            keep = np.zeros_like(mi, dtype=bool)
+            keep[i, :] = keep[:, i] = True
+            mi[~keep] = 0
+
+        flat = np.argsort(mi, axis=None)[::-1][:k]
+        pairs = []
+        for i, j in zip(*np.unravel_index(flat, mi.shape)):
+            if mi[i, j] <= 0:
+                break
+            pairs.append((self.stats[i], self.stats[j],
+                          self.r[i, j] ** 2, mi[i, j]))
+
+        return pairs
+
+
+@st.cache_resource
+def season_correlations(league, season):
+    """ `StatCorrelations` of a league and season's p90/PAdj frame
+    (`metrics.season_metrics`), computed once per process. """
+    return StatCorrelations(season_metrics(league, season))
@@ -0,0 +1,168 @@
+from abc import ABC, abstractmethod
+
+import numpy as np
+from matplotlib.path import Path
+from matplotlib.transforms import Bbox
+
+# StatsBomb pitch, split into square cells. A 2 unit cell puts the penalty
+# box (x=102, y=18, 62) on cell edges
+PITCH_LENGTH = 120
+PITCH_WIDTH = 80
+CELL_SIZE = 2
+N_COLS = PITCH_LENGTH // CELL_SIZE
+N_ROWS = PITCH_WIDTH // CELL_SIZE
+N_CELLS = N_COLS * N_ROWS
+
+# Cell id of events without a location (e.g. no end point)
+NO_CELL = N_CELLS
+
+# Lower-left corner of every cell, indexed by cell id
+_CELL_X = np.tile(np.arange(N_COLS) * CELL_SIZE, N_ROWS)
+_CELL_Y = np.repeat(np.arange(N_ROWS) * CELL_SIZE, N_COLS)
+
+
+def cell_ids(x, y):
+    """ Grid cell of each StatsBomb point, NO_CELL where it is missing. """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    missing = np.isnan(x) | np.isnan(y)
+
+    col = np.clip(np.floor(np.nan_to_num(x) / CELL_SIZE), 0, N_COLS - 1)
+    row = np.clip(np.floor(np.nan_to_num(y) / CELL_SIZE), 0, N_ROWS - 1)
+    cells = (row * N_COLS + col).astype(np.int16)
+    cells[missing] = NO_CELL
+
+    return cells
+
+
+class Zone(ABC):
+    """ Area of the pitch in StatsBomb coordinates. Subclasses say which
+    points are inside (`contains`) and which cells are fully inside or
+    only partly (`_cells`); the grid then answers most points by cell. """
+
+    _cell_states = None
+
+    @abstractmethod
+    def contains(self, x, y):
+        """ Mask of the points (x, y arrays) inside the zone. """
+
+    @abstractmethod
+    def _cells(self):
+        """ (full, partial) boolean arrays over cell ids. """
+
+    def cells(self):
+        """ (full, partial) boolean arrays over cell ids, NO_CELL included. """
+        if self._cell_states is None:
+            full, partial = self._cells()
+            self._cell_states = (np.append(full, False),
+                                 np.append(partial, False))
+
+        return self._cell_states
+
+    def mask(self, cells, x, y):
+        """ Which points, given their cells and coordinates, are inside.
+        Only points in partly covered cells are tested exactly. """
+        full, partial = self.cells()
+        cells = np.asarray(cells)
+        mask = full[cells]
+
+        edge = np.flatnonzero(partial[cells])
+        if len(edge):
+            x = np.asarray(x)[edge]
+            y = np.asarray(y)[edge]
+            mask[edge] = self.contains(x, y)
+
+        return mask
+
+
+class Rect(Zone):
+    """ Rectangle from x1 to x2 and y1 to y2, edges included. """
+
+    def __init__(self, x1, x2, y1=0, y2=PITCH_WIDTH):
+        self.x1, self.x2 = x1, x2
+        self.y1, self.y2 = y1, y2
+
+    def __eq__(self, other):
+        return isinstance(other, Rect) and self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def __repr__(self):
+        return f'Rect{self._key()}'
+
+    def _key(self):
+        return self.x1, self.x2, self.y1, self.y2
+
+    def contains(self, x, y):
+        return ((x >= self.x1) & (x <= self.x2)
+                & (y >= self.y1) & (y <= self.y2))
+
+    def _cells(self):
+        x0, y0 = _CELL_X, _CELL_Y
+        x1, y1 = x0 + CELL_SIZE, y0 + CELL_SIZE
+
+        # Cells are half-open, except the last column/row which hold the
+        # pitch edge
+        x_end = np.where(x1 == PITCH_LENGTH, x1, x1 - 1e-9)
+        y_end = np.where(y1 == PITCH_WIDTH, y1, y1 - 1e-9)
+        full = ((x0 >= self.x1) & (x_end <= self.x2)
+                & (y0 >= self.y1) & (y_end <= self.y2))
+        overlap = ((x0 <= self.x2) & (x1 >= self.x1)
+                   & (y0 <= self.y2) & (y1 >= self.y1))
+
+        return full, overlap & ~full
+
+
+class Polygon(Zone):
+    """ Polygon through `vertices` [(x, y), ...] of StatsBomb points. """
+
+    def __init__(self, vertices):
+        self.vertices = tuple(map(tuple, vertices))
+        self.path = Path(np.array(self.vertices + self.vertices[:1]),
+                         closed=True)
+
+    def __eq__(self, other):
+        return isinstance(other, Polygon) and self.vertices == other.vertices
+
+    def __hash__(self):
+        return hash(self.vertices)
+
+    def __repr__(self):
+        return f'Polygon({self.vertices})'
+
+    def contains(self, x, y):
+        points = np.column_stack([x, y])
+        if not len(points):
+            return np.zeros(0, dtype=bool)
+
+        return self.path.contains_points(points)
+
+    def _cells(self):
+        full = np.zeros(N_CELLS, dtype=bool)
+        partial = np.zeros(N_CELLS, dtype=bool)
+
+        # Only cells under the bounding box can hold points
+        (bx0, by0), (bx1, by1) = self.path.get_extents().get_points()
+        near = np.flatnonzero(
+            (_CELL_X <= bx1) & (_CELL_X + CELL_SIZE >= bx0)
+            & (_CELL_Y <= by1) & (_CELL_Y + CELL_SIZE >= by0)
+        )
+
+        centres = np.column_stack([_CELL_X[near], _CELL_Y[near]]) \
+            + CELL_SIZE / 2
+        inside = self.path.contains_points(centres)
+        for cell, centre_inside in zip(near, inside):
+            bbox = Bbox.from_bounds(_CELL_X[cell], _CELL_Y[cell],
+                                    CELL_SIZE, CELL_SIZE)
+            # Cells the outline runs through need the exact test
+            if self.path.intersects_bbox(bbox, filled=False):
+                partial[cell] = True
+            else:
+                full[cell] = centre_inside
+
+        return full, partial
+
+
+# Attacked penalty box
+PENALTY_BOX = Rect(102, PITCH_LENGTH, 18, 62)